@@ -0,0 +1,271 @@
+"""
+Backfills historical scores one league season at a time, writing each season to its own JSON shard.
+Completed seasons are recorded in a checkpoint file, so an interrupted run picks up where it stopped and a failure only costs the season that was in progress.
+Seasons run in parallel, and every HTTP request to a league's site takes a token from that league's shared rate limiter.
+A season is only checkpointed once its last date has passed, so a season still in progress is fetched again by the next run.
+
+Shards are written in the same format as ScoreLoader.DumpLoadedScores, so they can be converted with score_archive.ConvertJsonDump.
+MLB seasons start in 1901, NBA seasons in 1946 (the 1946-47 BAA season), and NFL seasons run from 2000 to 2025.
+Without --end, each league runs up to its last completed season.
+
+Usage: python backfill.py OUT_DIR --leagues mlb nba nfl --start 2000 --end 2024
+"""
+
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+
+import fetch
+import mlb_scores
+import nba_scores
+import nfl_scores
+from nfl_week import NFLWeek, WeekType, GetRegularSeasonLength
+from scorecard import Scorecard
+
+_first_seasons = {
+    'mlb' : 1901,
+    'nba' : 1946,
+    'nfl' : 2000
+}
+
+_last_nfl_season = 2025
+
+_league_hosts = {
+    'mlb' : 'statsapi.mlb.com',
+    'nba' : 'www.nba.com',
+    'nfl' : 'site.api.espn.com'
+}
+
+# The 2019-20 season was suspended and finished in the bubble that fall, which pushed 2020-21 into July
+_nba_season_dates = {
+    2019 : (date(2019, 10, 1), date(2020, 10, 31)),
+    2020 : (date(2020, 11, 1), date(2021, 7, 31))
+}
+
+def GetSeasonDates(league: str, season: int) -> tuple[date, date]:
+    if league == 'mlb':
+        return date(season, 3, 1), date(season, 11, 30)
+    if league == 'nba':
+        return _nba_season_dates.get(season, (date(season, 10, 1), date(season + 1, 6, 30)))
+    if league == 'nfl':
+        return date(season, 8, 1), date(season + 1, 2, 28)
+    raise ValueError(f'Unknown league: {league}')
+
+def IsSeasonComplete(league: str, season: int, today: date = None) -> bool:
+    if today is None:
+        today = date.today()
+    return GetSeasonDates(league, season)[1] < today
+
+def GetLastCompletedSeason(league: str, today: date = None) -> int:
+    if today is None:
+        today = date.today()
+    season = today.year
+    while not IsSeasonComplete(league, season, today):
+        season -= 1
+    if league == 'nfl':
+        season = min(season, _last_nfl_season)
+    return season
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float) -> None:
+        self.interval = 60 / requests_per_minute
+        self._next_time = 0
+        self._lock = threading.Lock()
+
+    def Wait(self) -> None:
+        with self._lock:
+            now = monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            sleep(wait_time)
+
+class RateLimitedTransport:
+    def __init__(self, limiters: dict[str, RateLimiter], transport) -> None:
+        self.limiters = limiters
+        self.transport = transport
+
+    def __call__(self, url: str, timeout: float = None):
+        limiter = self.limiters.get(urlsplit(url).hostname)
+        if limiter is not None:
+            limiter.Wait()
+        return self.transport(url, timeout=timeout)
+
+class Checkpoint:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.completed = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(filename):
+            with open(filename) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be cut short if the previous run was killed mid-write
+                        continue
+                    self.completed[(entry['league'], entry['season'])] = entry['games']
+
+    def IsDone(self, league: str, season: int) -> bool:
+        return (league, season) in self.completed
+
+    def MarkDone(self, league: str, season: int, games: int) -> None:
+        with self._lock:
+            with open(self.filename, 'a') as file:
+                file.write(json.dumps({'league' : league, 'season' : season, 'games' : games}) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            self.completed[(league, season)] = games
+
+def _dateRange(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+def _monthRanges(start: date, end: date) -> list[tuple[date, date]]:
+    ranges = []
+    month_start = start
+    while month_start <= end:
+        next_month = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        ranges.append((month_start, min(end, next_month - timedelta(days=1))))
+        month_start = next_month
+    return ranges
+
+def GetMLBSeason(season: int) -> list[Scorecard]:
+    start, end = GetSeasonDates('mlb', season)
+    team_dict = mlb_scores.LoadTeams()
+    scores = []
+    for month_start, month_end in _monthRanges(start, end):
+        scores += mlb_scores.GetScores(month_start, month_end, ignoreLive=True, team_dict=team_dict)
+    return scores
+
+def GetNBASeason(season: int) -> list[Scorecard]:
+    scores = []
+    for day in _dateRange(*GetSeasonDates('nba', season)):
+        scores += nba_scores.GetScores(day)
+    return scores
+
+def GetNFLSeason(season: int) -> list[Scorecard]:
+    weeks = [(WeekType.PRESEASON, num) for num in range(1, 5)]
+    weeks += [(WeekType.REGULAR, num) for num in range(1, GetRegularSeasonLength(season) + 1)]
+    weeks += [(WeekType.POSTSEASON, num) for num in range(1, 6)]
+
+    scores = []
+    for week_type, week_num in weeks:
+        week = NFLWeek()
+        week.SetSeason(season)
+        week.SetWeekType(week_type)
+        week.SetWeekNum(week_num)
+        scores += nfl_scores.GetWeekScores(week)
+    return scores
+
+_season_loaders = {
+    'mlb' : GetMLBSeason,
+    'nba' : GetNBASeason,
+    'nfl' : GetNFLSeason
+}
+
+def GetWorkUnits(leagues: list[str], first_season: int, last_season: int = None) -> list[tuple[str, int]]:
+    for league in leagues:
+        if league not in _season_loaders:
+            raise ValueError(f'Unknown league: {league}')
+
+    last_seasons = {league : GetLastCompletedSeason(league) if last_season is None else last_season for league in leagues}
+
+    units = []
+    for season in range(first_season, max(last_seasons.values(), default=first_season - 1) + 1):
+        for league in leagues:
+            if season < _first_seasons[league] or season > last_seasons[league]:
+                continue
+            if league == 'nfl' and season > _last_nfl_season:
+                continue
+            units.append((league, season))
+    return units
+
+def GetShardFilename(out_dir: str, league: str, season: int) -> str:
+    return os.path.join(out_dir, league, f'{season}.json')
+
+def WriteShard(filename: str, league: str, season: int, scores: list[Scorecard]) -> None:
+    shard = {
+        'scores' : {league : [score.getDict() for score in scores if isinstance(score, Scorecard)]},
+        'date' : None,
+        'season' : season
+    }
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    temp_filename = f'{filename}.tmp'
+    with open(temp_filename, 'w') as file:
+        json.dump(shard, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_filename, filename)
+
+def RunUnit(out_dir: str, league: str, season: int, checkpoint: Checkpoint) -> int:
+    scores = _season_loaders[league](season)
+    WriteShard(GetShardFilename(out_dir, league, season), league, season, scores)
+    if IsSeasonComplete(league, season):
+        checkpoint.MarkDone(league, season, len(scores))
+    return len(scores)
+
+def RunBackfill(out_dir: str, units: list[tuple[str, int]], workers: int = 4, requests_per_minute: float = 60, checkpoint_filename: str = None) -> dict:
+    if checkpoint_filename is None:
+        checkpoint_filename = os.path.join(out_dir, 'checkpoint.jsonl')
+    os.makedirs(out_dir, exist_ok=True)
+
+    checkpoint = Checkpoint(checkpoint_filename)
+    limiters = {_league_hosts[league] : RateLimiter(requests_per_minute) for league in _season_loaders}
+    pending = [(league, season) for league, season in units if not checkpoint.IsDone(league, season)]
+
+    summary = {
+        'skipped' : len(units) - len(pending),
+        'completed' : 0,
+        'games' : 0,
+        'failed' : {}
+    }
+
+    previous_transport = fetch.GetTransport()
+    fetch.SetTransport(RateLimitedTransport(limiters, previous_transport))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(RunUnit, out_dir, league, season, checkpoint) : (league, season) for league, season in pending}
+            for future in as_completed(futures):
+                league, season = futures[future]
+                try:
+                    games = future.result()
+                except Exception as e:
+                    summary['failed'][f'{league} {season}'] = str(e) or type(e).__name__
+                    print(f'{league} {season}: failed ({e})')
+                    continue
+                summary['completed'] += 1
+                summary['games'] += games
+                in_progress = '' if checkpoint.IsDone(league, season) else ' (in progress, not checkpointed)'
+                print(f'{league} {season}: {games} games{in_progress}')
+    finally:
+        fetch.SetTransport(previous_transport)
+
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Backfill historical scores into per-season shards.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--leagues', nargs='+', choices=list(_season_loaders), default=list(_season_loaders))
+    parser.add_argument('--start', type=int, required=True)
+    parser.add_argument('--end', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests-per-minute', type=float, default=60)
+    parser.add_argument('--checkpoint', default=None)
+    args = parser.parse_args()
+
+    units = GetWorkUnits(args.leagues, args.start, args.end)
+    summary = RunBackfill(args.out_dir, units, args.workers, args.requests_per_minute, args.checkpoint)
+
+    print(f'{summary["completed"]} seasons written ({summary["games"]} games), {summary["skipped"]} already done, {len(summary["failed"])} failed')
+    if len(summary['failed']) > 0:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Contains the CassetteRecorder and CassettePlayer classes, which record every response the league modules fetch to a compact on-disk cassette and replay it later with no network access.
+Both are fetch transports: used as context managers they install themselves with fetch.SetTransport and restore the previous transport on exit.
+Setting the SCORES_CASSETTE environment variable (with SCORES_CASSETTE_MODE set to record or replay, and optionally SCORES_REPLAY_SPEED) installs one when fetch is imported.
+
+A cassette is a gzip stream of entries: u16 status, f32 seconds the response took, u32 lengths of the url, headers and body, followed by the url, the headers as JSON, and the body.
+Appending to a cassette adds another gzip member, which reads back as one continuous stream of entries.
+Replayed responses for a url are returned in the order they were recorded, repeating from the start once they run out.
+Running this module records a range of days through ScoreLoader, or replays them from many threads to measure throughput and profile the parsers.
+"""
+
+import argparse
+import atexit
+import cProfile
+import gzip
+import json
+import os
+import pstats
+import struct
+import threading
+import warnings
+from datetime import date, timedelta
+from time import monotonic, sleep
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import fetch
+
+_magic = b'SSCS\x01'
+_entry_header = struct.Struct('<HfIII')
+
+# requests has already decoded the body, so these no longer describe what is stored
+_dropped_headers = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+class CassetteMiss(LookupError):
+    pass
+
+class CassetteRecorder:
+    def __init__(self, filename: str, append: bool = False) -> None:
+        self.filename = filename
+        self.entries = 0
+
+        exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+        self._file = gzip.open(filename, 'ab' if append else 'wb')
+        if not exists:
+            self._file.write(_magic)
+        self._lock = threading.Lock()
+        self._transport = fetch.GetTransport()
+        self._previous_transport = None
+
+    def __enter__(self) -> 'CassetteRecorder':
+        self._previous_transport = fetch.GetTransport()
+        if self._previous_transport is not self:
+            self._transport = self._previous_transport
+        fetch.SetTransport(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        fetch.SetTransport(self._previous_transport)
+        self.Close()
+
+    def __call__(self, url: str, timeout: float = None) -> requests.Response:
+        start = monotonic()
+        response = self._transport(url, timeout=timeout)
+        elapsed = monotonic() - start
+
+        headers = {key : value for key, value in response.headers.items() if str.lower(key) not in _dropped_headers}
+        url_bytes = url.encode('utf-8')
+        header_bytes = json.dumps(headers, separators=(',', ':')).encode('utf-8')
+        body = response.content
+
+        with self._lock:
+            self._file.write(_entry_header.pack(response.status_code, elapsed, len(url_bytes), len(header_bytes), len(body)))
+            self._file.write(url_bytes)
+            self._file.write(header_bytes)
+            self._file.write(body)
+            self.entries += 1
+
+        return response
+
+    def Close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+def _readExact(file, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise EOFError('Cassette is truncated')
+    return data
+
+def LoadCassette(filename: str) -> dict[str, list[tuple]]:
+    entries = {}
+    with gzip.open(filename, 'rb') as file:
+        if file.read(len(_magic)) != _magic:
+            raise ValueError('File is not a score cassette')
+
+        while True:
+            try:
+                header = file.read(_entry_header.size)
+                if len(header) == 0:
+                    break
+                if len(header) != _entry_header.size:
+                    raise EOFError('Cassette is truncated')
+
+                status, elapsed, url_length, header_length, body_length = _entry_header.unpack(header)
+                url = _readExact(file, url_length).decode('utf-8')
+                headers = json.loads(_readExact(file, header_length))
+                body = _readExact(file, body_length)
+            except EOFError:
+                # A recorder that was interrupted leaves a partial entry at the end
+                warnings.warn(f'Ignoring truncated entry at the end of {filename}')
+                break
+            entries.setdefault(url, []).append((status, elapsed, headers, body))
+
+    return entries
+
+class CassettePlayer:
+    def __init__(self, filename: str, speed: float = None) -> None:
+        self.filename = filename
+        self.speed = speed
+        self.entries = LoadCassette(filename)
+        self.replayed = 0
+
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._previous_transport = None
+
+    def __enter__(self) -> 'CassettePlayer':
+        self._previous_transport = fetch.GetTransport()
+        fetch.SetTransport(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        fetch.SetTransport(self._previous_transport)
+
+    def GetUrls(self) -> list[str]:
+        return list(self.entries.keys())
+
+    def __call__(self, url: str, timeout: float = None) -> requests.Response:
+        try:
+            url_entries = self.entries[url]
+        except KeyError:
+            raise CassetteMiss(f'No recorded response for {url}')
+
+        with self._lock:
+            position = self._positions.get(url, 0)
+            self._positions[url] = (position + 1) % len(url_entries)
+            self.replayed += 1
+        status, elapsed, headers, body = url_entries[position]
+
+        if self.speed is not None and self.speed > 0:
+            delay = elapsed / self.speed
+            if timeout is not None and delay > timeout:
+                sleep(timeout)
+                raise requests.Timeout(f'Replayed response for {url} exceeded the timeout')
+            sleep(delay)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+def InstallFromEnvironment() -> (CassetteRecorder | CassettePlayer):
+    filename = os.environ['SCORES_CASSETTE']
+    mode = str.lower(os.environ.get('SCORES_CASSETTE_MODE', 'replay'))
+
+    if mode == 'record':
+        transport = CassetteRecorder(filename, append=True)
+        atexit.register(transport.Close)
+    elif mode == 'replay':
+        speed = os.environ.get('SCORES_REPLAY_SPEED')
+        transport = CassettePlayer(filename, None if speed is None else float(speed))
+    else:
+        raise ValueError(f'Unknown cassette mode: {mode}')
+
+    fetch.SetTransport(transport)
+    return transport
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+def RecordDays(filename: str, start: date, end: date) -> int:
+    from scores import ScoreLoader
+
+    loader = ScoreLoader()
+    with CassetteRecorder(filename) as recorder:
+        for day in _days(start, end):
+            loader.LoadAllScores(day)
+    return recorder.entries
+
+def ReplayDays(filename: str, start: date, end: date, threads: int = 8, iterations: int = 10, speed: float = None) -> dict:
+    from scores import ScoreLoader
+
+    days = _days(start, end)
+    errors = []
+
+    def worker() -> None:
+        loader = ScoreLoader()
+        loader.requests_per_minute = 0
+        for _ in range(iterations):
+            for day in days:
+                # Refreshing skips the loader's cache, so every iteration runs the parsers
+                for league in ['mlb', 'nba', 'nfl']:
+                    try:
+                        loader.RefreshScores(league,day)
+                    except Exception as e:
+                        errors.append(e)
+
+    with CassettePlayer(filename, speed) as player:
+        begin = monotonic()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = monotonic() - begin
+
+    scoreboards = threads * iterations * len(days)
+    return {
+        'scoreboards' : scoreboards,
+        'responses' : player.replayed,
+        'errors' : len(errors),
+        'seconds' : elapsed,
+        'scoreboards_per_second' : scoreboards / elapsed if elapsed > 0 else float('inf')
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Record or replay score site traffic.')
+    parser.add_argument('mode', choices=['record', 'replay', 'profile'])
+    parser.add_argument('cassette')
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today() - timedelta(days=1))
+    parser.add_argument('--end', type=date.fromisoformat, default=None)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--speed', type=float, default=None)
+    args = parser.parse_args()
+    end = args.start if args.end is None else args.end
+
+    if args.mode == 'record':
+        entries = RecordDays(args.cassette, args.start, end)
+        print(f'Recorded {entries} responses to {args.cassette}')
+    elif args.mode == 'replay':
+        results = ReplayDays(args.cassette, args.start, end, args.threads, args.iterations, args.speed)
+        print(f'{results["scoreboards"]} scoreboards from {results["responses"]} replayed responses in {results["seconds"]:.2f}s '
+              f'({results["scoreboards_per_second"]:.1f}/s, {results["errors"]} errors)')
+    else:
+        profile = cProfile.Profile()
+        profile.enable()
+        ReplayDays(args.cassette, args.start, end, 1, args.iterations, None)
+        profile.disable()
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(25)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""
+Contains the ChangeLog class, an append-only log of every score and state change seen while polling live games.
+Each refreshed list of scorecards is compared with the last state of each game, and only the games that changed are written.
+Games more than a day from the time of the refresh, and games already final when first seen, are left out, so loading a past slate adds nothing to the log.
+A game is forgotten once its final state is written, or once its date falls behind the current day, so memory stays bounded in a long-running poller.
+Writes happen on a background thread, so recording a refresh never waits on the disk.
+
+The log is split into one segment per UTC day, made of three files:
+    YYYY-MM-DD.log      records of i64 timestamp (ms), u16 game id, i16 away score, i16 home score, u16 state length, state
+    YYYY-MM-DD.idx      a sparse index of (i64 timestamp, u64 offset) pairs for seeking to a time
+    YYYY-MM-DD.games    one JSON line per game id with the teams, date and start time of the game
+Scores of -1 mean the score was not set.
+
+ReplayGame yields the progression of a single game, and ScoreboardAt rebuilds every game's scorecard as it was at any moment.
+Running this module measures how many changes per second the log can record.
+"""
+
+import json
+import os
+import queue
+import struct
+import tempfile
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter, time
+from typing import Iterator
+
+from scorecard import Scorecard, ParseStartTime, ToEastern
+from timeline import IsFinal
+
+_record_header = struct.Struct('<qHhhH')
+_index_entry = struct.Struct('<qQ')
+
+_no_score = -1
+
+def GameKey(league: str, score: Scorecard) -> str:
+    start_time = '' if score.start_time is None else score.start_time.isoformat()
+    return f'{league}|{score.date}|{score.abbr_team1}@{score.abbr_team2}|{start_time}'
+
+def _dayOf(timestamp_ms: int) -> date:
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).date()
+
+def _toDatetime(timestamp_ms: int) -> datetime:
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+
+def _toMilliseconds(moment: datetime) -> int:
+    if moment.tzinfo is None:
+        raise ValueError('Moment must be timezone-aware')
+    return int(moment.timestamp() * 1000)
+
+class _Segment:
+    def __init__(self, directory: str, day: date, index_interval: int) -> None:
+        base = os.path.join(directory, str(day))
+        self.index_interval = index_interval
+        self.game_ids = {}
+        self.last_timestamp = 0
+        self.since_index = 0
+
+        if os.path.exists(f'{base}.games'):
+            with open(f'{base}.games') as file:
+                for line in file:
+                    try:
+                        game = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self.game_ids[game['key']] = game['id']
+
+        # The write offset is tracked here, since tell() on an append handle does not follow truncate()
+        self.offset = self._recover(f'{base}.log', f'{base}.idx')
+
+        self.log = open(f'{base}.log', 'ab')
+        self.log.truncate(self.offset)
+        self.index = open(f'{base}.idx', 'ab')
+        self.games = open(f'{base}.games', 'a')
+
+    def _recover(self, log_filename: str, index_filename: str) -> int:
+        if not os.path.exists(log_filename):
+            return 0
+
+        offset = 0
+        if os.path.exists(index_filename):
+            with open(index_filename, 'rb') as file:
+                data = file.read()
+            whole = len(data) - len(data) % _index_entry.size
+            if whole > 0:
+                self.last_timestamp, offset = _index_entry.unpack_from(data, whole - _index_entry.size)
+
+        # Walk the records after the last index entry, dropping any partial record left by a crash
+        with open(log_filename, 'rb') as file:
+            file.seek(offset)
+            data = file.read()
+        position = 0
+        while position + _record_header.size <= len(data):
+            timestamp, _, _, _, state_length = _record_header.unpack_from(data, position)
+            if position + _record_header.size + state_length > len(data):
+                break
+            self.last_timestamp = max(self.last_timestamp, timestamp)
+            position += _record_header.size + state_length
+            self.since_index += 1
+        return offset + position
+
+    def GameId(self, key: str, league: str, score: Scorecard) -> int:
+        try:
+            return self.game_ids[key]
+        except KeyError:
+            pass
+
+        game_id = len(self.game_ids)
+        if game_id > 0xFFFF:
+            raise OverflowError('Too many games in one change log segment')
+        self.game_ids[key] = game_id
+        self.games.write(json.dumps({
+            'id' : game_id,
+            'key' : key,
+            'league' : league,
+            'names' : [score.name_team1, score.name_team2],
+            'abbrs' : [score.abbr_team1, score.abbr_team2],
+            'date' : None if score.date is None else str(score.date),
+            'start_time' : None if score.start_time is None else score.start_time.isoformat()
+        }) + '\n')
+        return game_id
+
+    def Write(self, timestamp: int, game_id: int, away_score: int, home_score: int, state: str) -> None:
+        # Timestamps never go backwards within a segment, which keeps the index sorted
+        timestamp = max(timestamp, self.last_timestamp)
+        self.last_timestamp = timestamp
+
+        if self.since_index == 0 or self.since_index >= self.index_interval:
+            self.index.write(_index_entry.pack(timestamp, self.offset))
+            self.since_index = 0
+
+        encoded = state.encode('utf-8')[:0xFFFF]
+        self.log.write(_record_header.pack(timestamp, game_id, away_score, home_score, len(encoded)))
+        self.log.write(encoded)
+        self.offset += _record_header.size + len(encoded)
+        self.since_index += 1
+
+    def Flush(self) -> None:
+        self.games.flush()
+        self.log.flush()
+        self.index.flush()
+
+    def Close(self) -> None:
+        self.games.close()
+        self.log.close()
+        self.index.close()
+
+class ChangeLog:
+    def __init__(self, directory: str, index_interval: int = 64, max_queue: int = 100000) -> None:
+        self.directory = directory
+        self.index_interval = index_interval
+        self.changes_recorded = 0
+        self.changes_dropped = 0
+        self.last_error = None
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._last_states = {}
+        self._state_day = None
+        self._state_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._segment = None
+        self._segment_day = None
+        self._thread = threading.Thread(target=self._run, name='change-log', daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'ChangeLog':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Close()
+
+    def Record(self, league: str, scores: list[Scorecard], timestamp: float = None) -> int:
+        if timestamp is None:
+            timestamp = time()
+        timestamp_ms = int(timestamp * 1000)
+
+        today = ToEastern(datetime.fromtimestamp(timestamp, timezone.utc)).date()
+
+        changes = []
+        with self._state_lock:
+            if self._state_day != today:
+                self._forgetBefore(today - timedelta(days=1))
+                self._state_day = today
+
+            for score in scores:
+                if not isinstance(score, Scorecard):
+                    continue
+                # Only games that can still change belong in the log, not past slates loaded for history
+                if score.date is not None and abs((score.date - today).days) > 1:
+                    continue
+                key = GameKey(league, score)
+                state = (score.score_team1, score.score_team2, score.game_state)
+                previous = self._last_states.get(key)
+                final = IsFinal(score)
+                if previous is None and final:
+                    continue
+                if previous is not None and previous[0] == state:
+                    continue
+                if final:
+                    del self._last_states[key]
+                else:
+                    self._last_states[key] = (state, score.date)
+                changes.append((timestamp_ms, league, key, score, state))
+
+        for change in changes:
+            try:
+                self._queue.put_nowait(change)
+            except queue.Full:
+                # Dropping a change is better than stalling the refresh that produced it
+                self.changes_dropped += 1
+        return len(changes)
+
+    def _forgetBefore(self, day: date) -> None:
+        for key, (_, game_date) in list(self._last_states.items()):
+            if game_date is not None and game_date < day:
+                del self._last_states[key]
+
+    def _getSegment(self, day: date) -> _Segment:
+        if self._segment_day != day:
+            if self._segment is not None:
+                self._segment.Close()
+            self._segment = _Segment(self.directory, day, self.index_interval)
+            self._segment_day = day
+        return self._segment
+
+    def _write(self, change: tuple) -> None:
+        timestamp_ms, league, key, score, (away_score, home_score, state) = change
+        segment = self._getSegment(_dayOf(timestamp_ms))
+        game_id = segment.GameId(key, league, score)
+        segment.Write(timestamp_ms, game_id,
+                      _no_score if away_score is None else away_score,
+                      _no_score if home_score is None else home_score,
+                      '' if state is None else state)
+        self.changes_recorded += 1
+
+    def _run(self) -> None:
+        while True:
+            change = self._queue.get()
+            try:
+                if change is None:
+                    if self._segment is not None:
+                        self._segment.Close()
+                        self._segment = None
+                        self._segment_day = None
+                    return
+                self._write(change)
+                if self._queue.empty() and self._segment is not None:
+                    self._segment.Flush()
+            except Exception as e:
+                self.last_error = e
+            finally:
+                self._queue.task_done()
+
+    def Flush(self) -> None:
+        self._queue.join()
+
+    def Close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _loadGames(self, day: date) -> dict[int, dict]:
+        games = {}
+        filename = os.path.join(self.directory, f'{day}.games')
+        if not os.path.exists(filename):
+            return games
+        with open(filename) as file:
+            for line in file:
+                try:
+                    game = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                games[game['id']] = game
+        return games
+
+    def _seekOffset(self, day: date, since_ms: int) -> int:
+        filename = os.path.join(self.directory, f'{day}.idx')
+        if since_ms is None or not os.path.exists(filename):
+            return 0
+        with open(filename, 'rb') as file:
+            data = file.read()
+        entries = [entry for entry in _index_entry.iter_unpack(data[:len(data) - len(data) % _index_entry.size])]
+        position = bisect_right([timestamp for timestamp, _ in entries], since_ms) - 1
+        if position < 0:
+            return 0
+        return entries[position][1]
+
+    def IterSegment(self, day: date, since: datetime = None, until: datetime = None) -> Iterator[tuple[datetime, Scorecard, str, str]]:
+        filename = os.path.join(self.directory, f'{day}.log')
+        if not os.path.exists(filename):
+            return
+
+        since_ms = None if since is None else _toMilliseconds(since)
+        until_ms = None if until is None else _toMilliseconds(until)
+        games = self._loadGames(day)
+
+        with open(filename, 'rb') as file:
+            file.seek(self._seekOffset(day, since_ms))
+            data = file.read()
+
+        position = 0
+        while position + _record_header.size <= len(data):
+            timestamp, game_id, away_score, home_score, state_length = _record_header.unpack_from(data, position)
+            position += _record_header.size
+            if position + state_length > len(data):
+                break
+            state = data[position:position + state_length].decode('utf-8')
+            position += state_length
+
+            if since_ms is not None and timestamp < since_ms:
+                continue
+            if until_ms is not None and timestamp > until_ms:
+                break
+
+            game = games.get(game_id)
+            if game is None:
+                continue
+
+            card = Scorecard()
+            card.setNames(game['names'][0],game['names'][1])
+            card.setAbbrs(game['abbrs'][0],game['abbrs'][1])
+            if away_score != _no_score and home_score != _no_score:
+                card.setScore(away_score,home_score)
+            card.setState(state or None)
+            if game['date'] is not None and game['date'] != 'None':
+                card.setDate(date.fromisoformat(game['date']))
+            card.setStartTime(ParseStartTime(game['start_time']))
+            yield _toDatetime(timestamp), card, game['league'], game['key']
+
+    def ReplayGame(self, game_key: str, day: date, days: int = 2) -> Iterator[tuple[datetime, Scorecard]]:
+        for offset in range(days):
+            for timestamp, card, _, key in self.IterSegment(day + timedelta(days=offset)):
+                if key == game_key:
+                    yield timestamp, card
+
+    def ScoreboardAt(self, moment: datetime, days: int = 2) -> dict[str, list[Scorecard]]:
+        latest = {}
+        moment_day = moment.astimezone(timezone.utc).date()
+        for offset in range(days - 1, -1, -1):
+            for _, card, league, key in self.IterSegment(moment_day - timedelta(days=offset), until=moment):
+                latest[key] = (league, card)
+
+        scoreboard = {}
+        for league, card in latest.values():
+            scoreboard.setdefault(league, []).append(card)
+        return scoreboard
+
+def main() -> None:
+    games = 60
+    polls = 2000
+    with tempfile.TemporaryDirectory() as directory:
+        log = ChangeLog(directory)
+        cards = []
+        for n in range(games):
+            card = Scorecard()
+            card.setAbbrs(f'A{n}', f'H{n}')
+            card.setDate(date(2024, 9, 8))
+            card.setState('1:00 pm ET')
+            cards.append(card)
+
+        start = perf_counter()
+        worst = 0
+        base = datetime(2024, 9, 8, 17, tzinfo=timezone.utc).timestamp()
+        for poll in range(polls):
+            for n, card in enumerate(cards):
+                if (poll + n) % 7 == 0:
+                    card.setScore((poll + n) // 7 % 50, poll // 11 % 50)
+                    card.setState(f'Q{poll // 500 + 1} {poll % 60}:00')
+            record_start = perf_counter()
+            log.Record('nfl', cards, base + poll * 5)
+            worst = max(worst, perf_counter() - record_start)
+        log.Flush()
+        elapsed = perf_counter() - start
+        recorded = log.changes_recorded
+        log.Close()
+
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        moment = datetime.fromtimestamp(base + polls * 5 / 2, timezone.utc)
+        start = perf_counter()
+        scoreboard = ChangeLog(directory).ScoreboardAt(moment)
+        rebuild = perf_counter() - start
+
+        print(f'{recorded} changes from {polls} polls of {games} games in {elapsed:.2f}s ({recorded / elapsed:.0f} changes/s)')
+        print(f'Slowest Record call: {worst * 1000:.2f}ms, {size} bytes on disk ({size / recorded:.1f} bytes/change)')
+        print(f'Rebuilt a scoreboard of {sum(len(cards) for cards in scoreboard.values())} games in {rebuild * 1000:.1f}ms, '
+              f'{sum(IsFinal(card) for cards in scoreboard.values() for card in cards)} final')
+
+if __name__ == '__main__':
+    main()
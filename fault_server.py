@@ -0,0 +1,144 @@
+"""
+Contains the FaultInjectingServer class, a local stand-in for the score sites that answers slowly, fails, or drops connections at configurable rates.
+Running this module compares the tail latency of fetch.Get under a few FetchPolicy settings against the injected faults.
+"""
+
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+
+import requests
+
+import fetch
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        pass
+
+class FaultInjectingServer:
+    def __init__(self, base_delay: float = 0.01, slow_rate: float = 0.05, slow_delay: float = 1.0,
+                 error_rate: float = 0.05, drop_rate: float = 0.01, seed: int = None) -> None:
+        self.base_delay = base_delay
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.requests_served = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _QuietServer(('127.0.0.1', 0), self._makeHandler())
+        self._thread = None
+
+    def __enter__(self) -> 'FaultInjectingServer':
+        self.Start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/'
+
+    def _draw(self) -> float:
+        with self._lock:
+            self.requests_served += 1
+            return self._random.random()
+
+    def _makeHandler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                roll = server._draw()
+
+                if roll < server.drop_rate:
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+
+                roll -= server.drop_rate
+                if roll < server.error_rate:
+                    sleep(server.base_delay)
+                    self.send_error(503)
+                    return
+
+                roll -= server.error_rate
+                if roll < server.slow_rate:
+                    sleep(server.slow_delay)
+                else:
+                    sleep(server.base_delay)
+
+                body = json.dumps({'path' : self.path}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def Start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def Stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+def Percentile(samples: list[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile))
+    return ordered[index]
+
+def RunLoad(url: str, policy: fetch.FetchPolicy, count: int) -> dict:
+    latencies = []
+    failures = 0
+    for n in range(count):
+        start = monotonic()
+        try:
+            response = fetch.Get(f'{url}?n={n}', policy)
+            if response.status_code != 200:
+                failures += 1
+        except requests.RequestException:
+            failures += 1
+        latencies.append(monotonic() - start)
+
+    return {
+        'requests' : count,
+        'failures' : failures,
+        'p50' : Percentile(latencies, 0.50),
+        'p95' : Percentile(latencies, 0.95),
+        'p99' : Percentile(latencies, 0.99),
+        'max' : max(latencies),
+        'hedges_sent' : policy.hedges_sent,
+        'hedges_won' : policy.hedges_won,
+        'retries_sent' : policy.retries_sent
+    }
+
+def main() -> None:
+    policies = {
+        'single attempt' : fetch.FetchPolicy(timeout=5.0, deadline=5.0, retries=0),
+        'retry/backoff' : fetch.FetchPolicy(timeout=0.5, deadline=5.0, retries=3, backoff_base=0.05),
+        'retry/backoff + hedge' : fetch.FetchPolicy(timeout=0.5, deadline=5.0, retries=3, backoff_base=0.05, hedge=True, hedge_delay=0.05)
+    }
+
+    for name, policy in policies.items():
+        with FaultInjectingServer(seed=6103) as server:
+            results = RunLoad(server.url, policy, 400)
+        print(f'{name}: {results["failures"]}/{results["requests"]} failed, '
+              f'p50 {results["p50"] * 1000:.0f}ms, p95 {results["p95"] * 1000:.0f}ms, '
+              f'p99 {results["p99"] * 1000:.0f}ms, max {results["max"] * 1000:.0f}ms, '
+              f'{results["retries_sent"]} retries, {results["hedges_sent"]} hedges ({results["hedges_won"]} won)')
+
+if __name__ == '__main__':
+    main()
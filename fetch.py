@@ -0,0 +1,217 @@
+"""
+Contains the FetchPolicy class and the Get function, which the league modules use for every request they make to the web.
+A policy sets a timeout for each attempt, an overall deadline, and how many times to retry on server (5xx) or connection errors, with jittered exponential backoff between attempts.
+With hedging enabled, a duplicate request is sent when the first has not answered by the recent p95 latency for that host, and whichever answers first is used.
+
+The transport that actually performs each request defaults to requests.get and can be swapped with SetTransport, which is how the cassette module records and replays traffic.
+"""
+
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import monotonic, sleep
+from urllib.parse import urlsplit
+
+import requests
+
+_retry_exceptions = (requests.ConnectionError, requests.Timeout)
+
+class FetchPolicy:
+    def __init__(self, timeout: float = 10.0, deadline: float = 30.0, retries: int = 3, backoff_base: float = 0.25, backoff_max: float = 4.0,
+                 hedge: bool = False, hedge_delay: float = 1.0, hedge_percentile: float = 0.95, min_samples: int = 20, max_samples: int = 200) -> None:
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+
+        self.attempts = 0
+        self.retries_sent = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def RecordLatency(self, host: str, seconds: float) -> None:
+        with self._lock:
+            try:
+                samples = self._latencies[host]
+            except KeyError:
+                samples = deque(maxlen=self.max_samples)
+                self._latencies[host] = samples
+            samples.append(seconds)
+
+    def GetHedgeDelay(self, host: str) -> float:
+        with self._lock:
+            samples = sorted(self._latencies.get(host, ()))
+
+        if len(samples) < self.min_samples:
+            return self.hedge_delay
+
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile))
+        return samples[index]
+
+    def GetBackoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+default_policy = FetchPolicy()
+
+_transport = requests.get
+
+# Hedges run on a bounded pool and are skipped when every slot is taken, so they never queue behind each other
+max_hedges = 8
+_hedge_executor = None
+_hedge_slots = threading.BoundedSemaphore(max_hedges)
+_executor_lock = threading.Lock()
+
+def SetDefaultPolicy(policy: FetchPolicy) -> None:
+    global default_policy
+    if not isinstance(policy, FetchPolicy):
+        raise TypeError('Expected FetchPolicy object')
+    default_policy = policy
+
+def GetTransport():
+    return _transport
+
+def SetTransport(transport) -> None:
+    global _transport
+    if transport is None:
+        transport = requests.get
+    _transport = transport
+
+def _getHedgeExecutor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=max_hedges, thread_name_prefix='fetch-hedge')
+        return _hedge_executor
+
+def _startAttempt(url: str, policy: FetchPolicy, host: str, timeout: float) -> Future:
+    # The first attempt gets a thread of its own, so its hedge timer measures upstream latency rather than time spent queued
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def run() -> None:
+        try:
+            future.set_result(_timedGet(url, policy, host, timeout))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name='fetch', daemon=True).start()
+    return future
+
+def _startHedge(url: str, policy: FetchPolicy, host: str, timeout: float) -> (Future | None):
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _getHedgeExecutor().submit(_timedGet, url, policy, host, timeout)
+    except BaseException:
+        _hedge_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hedge_slots.release())
+    return future
+
+def _timedGet(url: str, policy: FetchPolicy, host: str, timeout: float) -> requests.Response:
+    start = monotonic()
+    response = _transport(url, timeout=timeout)
+    if response.status_code < 500:
+        policy.RecordLatency(host, monotonic() - start)
+    return response
+
+def _hedgedGet(url: str, policy: FetchPolicy, host: str, timeout: float) -> requests.Response:
+    start = monotonic()
+
+    first = _startAttempt(url, policy, host, timeout)
+    done, _ = wait([first], timeout=min(policy.GetHedgeDelay(host), timeout))
+    if done:
+        return first.result()
+
+    second = _startHedge(url, policy, host, timeout)
+    pending = {first}
+    if second is not None:
+        policy._count('hedges_sent')
+        pending.add(second)
+
+    fallback = None
+    error = None
+    while len(pending) > 0:
+        remaining = timeout - (monotonic() - start)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            response = future.result()
+            if response.status_code >= 500:
+                fallback = fallback or response
+                continue
+            if future is second:
+                policy._count('hedges_won')
+            return response
+
+    if fallback is not None:
+        return fallback
+    if error is not None:
+        raise error
+    raise requests.Timeout(f'Timed out fetching {url}')
+
+def Get(url: str, policy: FetchPolicy = None) -> requests.Response:
+    if policy is None:
+        policy = default_policy
+
+    host = urlsplit(url).netloc
+    start = monotonic()
+    response = None
+    error = None
+
+    for attempt in range(policy.retries + 1):
+        remaining = policy.deadline - (monotonic() - start)
+        if remaining <= 0:
+            break
+        if attempt > 0:
+            policy._count('retries_sent')
+        policy._count('attempts')
+
+        timeout = min(policy.timeout, remaining)
+        try:
+            if policy.hedge:
+                response = _hedgedGet(url, policy, host, timeout)
+            else:
+                response = _timedGet(url, policy, host, timeout)
+            error = None
+        except _retry_exceptions as e:
+            response = None
+            error = e
+
+        if response is not None and response.status_code < 500:
+            return response
+
+        backoff = policy.GetBackoff(attempt)
+        if attempt == policy.retries or backoff >= policy.deadline - (monotonic() - start):
+            break
+        sleep(backoff)
+
+    if response is not None:
+        return response
+    if error is not None:
+        raise error
+    raise requests.Timeout(f'Deadline exceeded fetching {url}')
+
+if os.environ.get('SCORES_CASSETTE'):
+    from cassette import InstallFromEnvironment
+    InstallFromEnvironment()
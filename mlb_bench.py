@@ -0,0 +1,115 @@
+"""
+Benchmarks how much the MLB stats api field filtering saves, using payloads recorded to a cassette.
+Recording fetches the full and the filtered schedule for a single day (one scoreboard) and for a whole season, along with the full and filtered team lists.
+Comparing reports the bytes, JSON decode time, and decode plus conversion time of each pair, without touching the network.
+
+Usage:
+    python mlb_bench.py record CASSETTE --day 2024-07-04 --season 2024
+    python mlb_bench.py compare CASSETTE --day 2024-07-04 --season 2024
+"""
+
+import argparse
+import json
+from datetime import date
+from time import perf_counter
+
+import fetch
+import mlb_scores
+from cassette import CassetteRecorder, LoadCassette
+
+def _getRanges(day: date, season: int) -> dict[str, tuple[date, date]]:
+    return {
+        'scoreboard' : (day, day),
+        'season' : (date(season, 3, 1), date(season, 11, 30))
+    }
+
+def _getUrlPairs(day: date, season: int) -> dict[str, tuple[str, str]]:
+    pairs = {}
+    for label, (start, end) in _getRanges(day, season).items():
+        pairs[label] = (mlb_scores.GetScoreUrl(start,end), mlb_scores.GetScoreUrl(start,end,filtered=True))
+    pairs['teams'] = (mlb_scores.GetTeamsUrl(), mlb_scores.GetTeamsUrl(filtered=True))
+    return pairs
+
+def RecordPayloads(filename: str, day: date, season: int) -> int:
+    with CassetteRecorder(filename) as recorder:
+        for full_url, filtered_url in _getUrlPairs(day, season).values():
+            fetch.Get(full_url)
+            fetch.Get(filtered_url)
+    return recorder.entries
+
+def _bestTime(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+def _convertSchedule(body: bytes, team_dict: dict) -> int:
+    score_json = json.loads(body)
+    count = 0
+    for day in score_json['dates']:
+        for game in day['games']:
+            mlb_scores.ConvertToScorecard(game,team_dict,ignoreLive=True)
+            count += 1
+    return count
+
+def ComparePayloads(filename: str, day: date, season: int, repeat: int = 5) -> dict[str, dict]:
+    entries = LoadCassette(filename)
+
+    def body(url: str) -> bytes:
+        try:
+            status, _, _, payload = entries[url][-1]
+        except KeyError:
+            raise LookupError(f'{url} was not recorded')
+        if status != 200:
+            raise LookupError(f'{url} was recorded with status {status}')
+        return payload
+
+    pairs = _getUrlPairs(day, season)
+    teams_json = json.loads(body(pairs['teams'][1]))
+    team_dict = {team['id'] : (team.get('clubName', team.get('teamName')), team['abbreviation']) for team in teams_json['teams']}
+
+    results = {}
+    for label, (full_url, filtered_url) in pairs.items():
+        full_body = body(full_url)
+        filtered_body = body(filtered_url)
+        result = {
+            'full_bytes' : len(full_body),
+            'filtered_bytes' : len(filtered_body),
+            'full_decode' : _bestTime(lambda: json.loads(full_body), repeat),
+            'filtered_decode' : _bestTime(lambda: json.loads(filtered_body), repeat)
+        }
+        if label != 'teams':
+            result['games'] = _convertSchedule(filtered_body, team_dict)
+            result['full_convert'] = _bestTime(lambda: _convertSchedule(full_body, team_dict), repeat)
+            result['filtered_convert'] = _bestTime(lambda: _convertSchedule(filtered_body, team_dict), repeat)
+        results[label] = result
+
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark MLB stats api field filtering on recorded payloads.')
+    parser.add_argument('mode', choices=['record', 'compare'])
+    parser.add_argument('cassette')
+    parser.add_argument('--day', type=date.fromisoformat, required=True)
+    parser.add_argument('--season', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    season = args.day.year if args.season is None else args.season
+
+    if args.mode == 'record':
+        entries = RecordPayloads(args.cassette, args.day, season)
+        print(f'Recorded {entries} responses to {args.cassette}')
+        return
+
+    for label, result in ComparePayloads(args.cassette, args.day, season, args.repeat).items():
+        reduction = 1 - result['filtered_bytes'] / result['full_bytes']
+        line = (f'{label}: {result["full_bytes"]} -> {result["filtered_bytes"]} bytes ({reduction:.0%} smaller), '
+                f'decode {result["full_decode"] * 1000:.2f} -> {result["filtered_decode"] * 1000:.2f}ms')
+        if 'games' in result:
+            line += f', decode+convert of {result["games"]} games {result["full_convert"] * 1000:.2f} -> {result["filtered_convert"] * 1000:.2f}ms'
+        print(line)
+
+if __name__ == '__main__':
+    main()
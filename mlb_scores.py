@@ -3,33 +3,103 @@ Library that enables the collection of MLB score info from https://statsapi.mlb.
 Information collected via MLB's official stats api.
 
 Scores accessible from the 1901 MLB season onward, though older team names may not be accurate.
+
+Requests ask the stats api to return only the fields this module reads (using the fields= and hydrate= parameters).
+If a filtered response is rejected or is missing a field that is needed, the full document is requested instead.
 """
 
 import requests
+import fetch
 from datetime import date
-from scorecard import Scorecard
+from typing import Callable
+from scorecard import Scorecard, ParseStartTime, ToEastern, StartTimeKey
+
+use_field_filter = True
+
+_base_link = 'https://statsapi.mlb.com'
+_teams_url = 'https://statsapi.mlb.com/api/v1/teams?sportId=1'
+
+_schedule_fields = 'dates,games,gamePk,link,gameDate,officialDate,status,abstractGameState,codedGameState,detailedState,startTimeTBD,teams,away,home,team,id,score,linescore,currentInning,inningState'
+_team_fields = 'teams,id,clubName,teamName,abbreviation'
+_live_fields = 'liveData,linescore,currentInning,inningState'
 
-def GetScoreUrl(startDate: date, endDate: date, default: bool = False) -> str:
+_required_game_fields = ['teams', 'officialDate', 'gameDate', 'status', 'link']
+
+def _addFilter(url: str, fields: str, hydrate: str = None) -> str:
+    separator = '&' if '?' in url else '?'
+    if hydrate is not None:
+        url += f'{separator}hydrate={hydrate}'
+        separator = '&'
+    return f'{url}{separator}fields={fields}'
+
+def GetTeamsUrl(filtered: bool = False) -> str:
+    if filtered:
+        return _addFilter(_teams_url,_team_fields)
+    return _teams_url
+
+def GetScoreUrl(startDate: date, endDate: date, default: bool = False, filtered: bool = False) -> str:
     if startDate is None and endDate is None:
         default = True
 
     if default:
-        return 'https://statsapi.mlb.com/api/v1/schedule?sportId=1'
-    
-    return f'https://statsapi.mlb.com/api/v1/schedule?sportId=1&startDate={str(startDate)}&endDate={str(endDate)}'
+        url = 'https://statsapi.mlb.com/api/v1/schedule?sportId=1'
+    else:
+        url = f'https://statsapi.mlb.com/api/v1/schedule?sportId=1&startDate={str(startDate)}&endDate={str(endDate)}'
+
+    if filtered:
+        url = _addFilter(url,_schedule_fields,'linescore')
+    return url
+
+def _hasScheduleFields(score_json: dict) -> bool:
+    if 'dates' not in score_json:
+        return False
+    for day in score_json['dates']:
+        for game in day.get('games', []):
+            if any(field not in game for field in _required_game_fields):
+                return False
+    return True
+
+def _hasTeamFields(teams_json: dict) -> bool:
+    if 'teams' not in teams_json:
+        return False
+    for team in teams_json['teams']:
+        if 'id' not in team or 'abbreviation' not in team or not ('clubName' in team or 'teamName' in team):
+            return False
+    return True
+
+def _hasLinescoreFields(live_json: dict) -> bool:
+    linescore = live_json.get('liveData', {}).get('linescore', {})
+    return 'inningState' in linescore and 'currentInning' in linescore
+
+def _loadFilteredJson(url: str, filtered_url: str, is_complete: Callable[[dict], bool], error_text: str) -> dict:
+    if use_field_filter:
+        # Any failure of the filtered request falls back to the full document, e.g. a cassette recorded without filtering
+        try:
+            r = fetch.Get(filtered_url)
+            if r.status_code == 200:
+                filtered_json = r.json()
+                if is_complete(filtered_json):
+                    return filtered_json
+        except (requests.RequestException, LookupError, ValueError):
+            pass
+
+    r = fetch.Get(url)
+    if r.status_code != 200:
+        raise requests.HTTPError(error_text)
+    return r.json()
 
 def LoadScoreJson(startDate: date, endDate: date, default: bool = False) -> dict:
     url = GetScoreUrl(startDate,endDate,default)
-    r = requests.get(url)
-    if r.status_code != 200:
-        raise requests.HTTPError('Failed to load scores')
-    return r.json()
+    filtered_url = GetScoreUrl(startDate,endDate,default,filtered=True)
+    return _loadFilteredJson(url,filtered_url,_hasScheduleFields,'Failed to load scores')
+
+def LoadLinescore(live_link: str) -> dict:
+    url = f'{_base_link}{live_link}'
+    game_json = _loadFilteredJson(url,_addFilter(url,_live_fields),_hasLinescoreFields,'Failed to load live game')
+    return game_json['liveData']['linescore']
 
 def LoadTeams() -> dict:
-    r = requests.get('https://statsapi.mlb.com/api/v1/teams?sportId=1')
-    if r.status_code != 200:
-        raise requests.HTTPError('Failed to load teams')
-    teams_json = r.json()
+    teams_json = _loadFilteredJson(GetTeamsUrl(),GetTeamsUrl(filtered=True),_hasTeamFields,'Failed to load teams')
     teams_list = teams_json['teams']
 
     teams = {}
@@ -76,12 +146,14 @@ def ConvertToScorecard(game: dict, team_dict: dict, ignoreLive: bool = True) ->
     official_date_parts = [int(part) for part in str.split(official_date_text,'-')]
     official_date = date(official_date_parts[0],official_date_parts[1],official_date_parts[2])
 
-    game_date_text = game['gameDate']
-    game_time_text = game_date_text[11:18]
-    game_time_hour_raw = (int(str.split(game_time_text,':')[0]) - 4) % 24
-    game_time_minute = int(str.split(game_time_text,':')[1])
+    start_time = ParseStartTime(game['gameDate'])
+    eastern_time = ToEastern(start_time)
+    game_time_hour_raw = eastern_time.hour
+    game_time_minute = eastern_time.minute
     if game_time_hour_raw > 12:
         game_time = f'{game_time_hour_raw - 12}:{game_time_minute:02d} pm ET'
+    elif game_time_hour_raw == 12:
+        game_time = f'12:{game_time_minute:02d} pm ET'
     elif game_time_hour_raw == 0:
         game_time = f'12:{game_time_minute:02d} am ET'
     else:
@@ -90,17 +162,18 @@ def ConvertToScorecard(game: dict, team_dict: dict, ignoreLive: bool = True) ->
     abstract_status = game['status']['abstractGameState']
     coded_state = game['status']['codedGameState']
     status_text = game['status']['detailedState']
-    if game['status']['startTimeTBD'] and abstract_status == 'Preview':
+    start_time_tbd = game['status']['startTimeTBD']
+    if start_time_tbd and abstract_status == 'Preview':
         status_text = 'TBD'
     elif abstract_status == 'Preview':
         status_text = game_time
     elif abstract_status == 'Live' and not ignoreLive and coded_state != 'I':
         status_text += f' {game_time}'
     elif abstract_status == 'Live' and not ignoreLive and coded_state == 'I':
-        base_link = 'https://statsapi.mlb.com'
-        live_link = game['link']
-        game_json = requests.get(f'{base_link}{live_link}').json()
-        linescore = game_json['liveData']['linescore']
+        # The filtered schedule hydrates the linescore, which saves a request per live game
+        linescore = game.get('linescore', {})
+        if 'inningState' not in linescore or 'currentInning' not in linescore:
+            linescore = LoadLinescore(game['link'])
         status_text = f'{str.upper(linescore["inningState"][0:3])} {linescore["currentInning"]}'
 
     game_started = coded_state == 'I' or coded_state == 'F'
@@ -111,12 +184,15 @@ def ConvertToScorecard(game: dict, team_dict: dict, ignoreLive: bool = True) ->
     if game_started: card.setScore(away_score,home_score)
     card.setState(status_text)
     card.setDate(official_date)
+    if not start_time_tbd:
+        card.setStartTime(start_time)
 
     return card
 
-def GetScores(startDate: date, endDate: date, default: bool = False, ignoreLive: bool = True) -> list[Scorecard]:
+def GetScores(startDate: date, endDate: date, default: bool = False, ignoreLive: bool = True, team_dict: dict = None) -> list[Scorecard]:
     score_json = LoadScoreJson(startDate,endDate,default)
-    team_dict = LoadTeams()
+    if team_dict is None:
+        team_dict = LoadTeams()
 
     dates = score_json['dates']
     scorecards = []
@@ -125,7 +201,7 @@ def GetScores(startDate: date, endDate: date, default: bool = False, ignoreLive:
         scores = [ConvertToScorecard(game,team_dict,ignoreLive) for game in date['games']]
         scorecards += scores
 
-    return scorecards
+    return sorted(scorecards,key=StartTimeKey)
 
 def GetScoresOnDay(day: date, default: bool = False, ignoreLive: bool = False) -> list[Scorecard]:
     return GetScores(day,day,default,ignoreLive)
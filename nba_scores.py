@@ -6,11 +6,12 @@ Scores accessible from the 1946-47 BAA season onward. (Does not contain data for
 """
 
 import requests
+import fetch
 import warnings
 import json
 from bs4 import BeautifulSoup, Tag
 from datetime import date
-from scorecard import Scorecard
+from scorecard import Scorecard, ParseStartTime, StartTimeKey, eastern
 
 _score_url = 'https://www.nba.com/games?date='
 
@@ -21,7 +22,7 @@ def GetScoreUrl(day: date, default = False) -> str:
 
 def GetSite(day: date, default: bool = False) -> requests.Response:
     score_url = GetScoreUrl(day, default)
-    data = requests.get(score_url)
+    data = fetch.Get(score_url)
     if data.status_code != 200:
         data.raise_for_status()
     return data
@@ -78,12 +79,20 @@ def ProcessCard(card: dict) -> Scorecard:
     date_text = str.split(game_time,'T')[0]
     date_parts = [int(part) for part in str.split(date_text,'-')]
 
+    # gameTimeEastern is eastern wall-clock time, even when it carries a 'Z'
+    game_time_utc = data.get('gameTimeUtc')
+    if game_time_utc:
+        start_time = ParseStartTime(game_time_utc)
+    else:
+        start_time = ParseStartTime(game_time,eastern)
+
     scorecard = Scorecard()
     scorecard.setState(state)
     scorecard.setNames(team_names[0],team_names[1])
     scorecard.setAbbrs(team_abbrs[0],team_abbrs[1])
     scorecard.setScore(scores[0],scores[1])
     scorecard.setDate(date(date_parts[0],date_parts[1],date_parts[2]))
+    scorecard.setStartTime(start_time)
 
     return scorecard
 
@@ -105,7 +114,7 @@ def GetScores(day: date, default: bool = False) -> list[Scorecard]:
 
     scorecards = [ProcessCard(card) for card in cards]
 
-    scores = sorted(scorecards)
+    scores = sorted(scorecards,key=StartTimeKey)
 
     return scores
     
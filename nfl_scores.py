@@ -7,26 +7,23 @@ Note that when calling GetScores() for a specific date, the scores returned will
 Scores accessible from the 2000 NFL season onward.
 """
 
-import requests
-from datetime import date, timedelta
-from scorecard import Scorecard
-from nfl_week import FindNearestWeek
+import fetch
+from datetime import date
+from scorecard import Scorecard, ParseStartTime, ToEastern, StartTimeKey
+from nfl_week import FindNearestWeek, NFLWeek
+
+_base_url = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
 
 def ProcessCompetition(competition: dict) -> Scorecard:
     competitors = competition['competitors']
     status = competition['status']
-    date_raw = competition['startDate']
+    start_time = ParseStartTime(competition['startDate'])
 
     # Construct time
 
-    date_raw_parts = str.split(date_raw,'T')
-    
-    time_raw = str.replace(date_raw_parts[1],"Z","")
-    clock_parts = [int(num) for num in str.split(time_raw,':')]
-    date_lowered = clock_parts[0] < 4
-
-    hour = (clock_parts[0] - 4) % 24
-    minute = clock_parts[1]
+    eastern_time = ToEastern(start_time)
+    hour = eastern_time.hour
+    minute = eastern_time.minute
 
     time_text = ''
     if hour > 12:
@@ -40,13 +37,7 @@ def ProcessCompetition(competition: dict) -> Scorecard:
     
     # Construct date
 
-    date_raw = date_raw_parts[0]
-    day_parts = [int(num) for num in str.split(date_raw,'-')]
-    game_date = date(day_parts[0],day_parts[1],day_parts[2])
-    if date_lowered:
-        d = timedelta(days=1)
-        game_date -= d
-    
+    game_date = eastern_time.date()
 
     # Construct status
 
@@ -92,6 +83,7 @@ def ProcessCompetition(competition: dict) -> Scorecard:
 
     score = Scorecard()
     score.setDate(game_date)
+    score.setStartTime(start_time)
     score.setState(status_text)
     score.setNames(away_team['name'],home_team['name'])
     score.setAbbrs(away_team['abbr'],home_team['abbr'])
@@ -107,14 +99,29 @@ def ProcessEvents(events: list) -> list[Scorecard]:
         event_scores = [ProcessCompetition(competition) for competition in competitions]
         scores += event_scores
 
-    return scores
+    return sorted(scores,key=StartTimeKey)
+
+def GetWeekScores(week: NFLWeek) -> list[Scorecard]:
+    season = week.season
+    week_num = week.week_num
+    season_type = week.week_type.value
+
+    url = f'{_base_url}?dates={season}&seasontype={season_type}&week={week_num}'
+
+    r = fetch.Get(url)
+    if r.status_code != 200:
+        r.raise_for_status()
+
+    data = r.json()
+
+    events = data['events']
+    return ProcessEvents(events)
 
 def GetScores(day: date, default: bool = False) -> list[Scorecard]:
     scores = None
-    base_url = 'https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard'
 
     if day == date.today() or default:
-        r = requests.get(base_url)
+        r = fetch.Get(_base_url)
         if r.status_code != 200:
             r.raise_for_status()
 
@@ -126,20 +133,7 @@ def GetScores(day: date, default: bool = False) -> list[Scorecard]:
         week = FindNearestWeek(day)
         if week is None:
             return []
-        season = week.season
-        week_num = week.week_num
-        season_type = week.week_type.value
-
-        url = f'{base_url}?dates={season}&seasontype={season_type}&week={week_num}'
-
-        r = requests.get(url)
-        if r.status_code != 200:
-            r.raise_for_status()
-
-        data = r.json()
-
-        events = data['events']
-        scores = ProcessEvents(events)
+        scores = GetWeekScores(week)
 
     return scores
 
@@ -167,9 +167,12 @@ class NFLWeek:
 
     def __eq__(self, other: 'NFLWeek') -> bool:
         if not isinstance(other,NFLWeek):
-            raise TypeError('Cannot compare NFLWeek to non-NFLWeek object')
+            return NotImplemented
         
         return self.week_num == other.week_num and self.week_type == other.week_type and self.season == other.season
+
+    def __hash__(self) -> int:
+        return hash((self.week_num, self.week_type, self.season))
     
     def __ne__(self, other: 'NFLWeek') -> bool:
         return not (self == other)
@@ -0,0 +1,149 @@
+"""
+Contains the Prefetcher class, which warms a ScoreLoader's caches in the background ahead of demand.
+Overnight it loads the coming day's MLB and NBA slates, it loads the upcoming NFL weeks found through nfl_week, and it refreshes a league shortly before the scheduled start of a game in its cached slate.
+
+Prefetches are limited by a request budget and only run while the league has been idle, so they do not crowd out interactive requests under the loader's rate limit.
+Slates warmed ahead of their first game are only served from cache for as long as the loader's pregame_cache_max_age allows, which the caller sets on the loader or passes when building the Prefetcher.
+"""
+
+import threading
+import warnings
+from datetime import date, datetime, timedelta
+from time import monotonic
+
+from nfl_week import FindNearestWeek
+from scorecard import Scorecard
+
+class Prefetcher:
+    def __init__(self, loader, budget_per_minute: float = 4, interval: float = 60, overnight_start: int = 22, overnight_end: int = 6,
+                 start_lead: float = 600, idle_seconds: float = 5, nfl_days_ahead: int = 7, pregame_cache_max_age: float = None) -> None:
+        self.loader = loader
+        self.budget_per_minute = budget_per_minute
+        self.interval = interval
+        self.overnight_start = overnight_start
+        self.overnight_end = overnight_end
+        self.start_lead = start_lead
+        self.idle_seconds = idle_seconds
+        self.nfl_days_ahead = nfl_days_ahead
+
+        # Warmed slates are only served if the loader allows it, which the caller opts into here or on the loader
+        if pregame_cache_max_age is not None:
+            loader.pregame_cache_max_age = pregame_cache_max_age
+        if loader.cache_max_age <= 0 and loader.pregame_cache_max_age <= 0:
+            warnings.warn('The loader never serves warmed slates from cache, so prefetching only adds requests; set pregame_cache_max_age', stacklevel=2)
+
+        self.prefetches = 0
+        self.deferred = 0
+        self.failures = 0
+        self.last_error = None
+
+        self._tokens = budget_per_minute
+        self._token_time = monotonic()
+        self._done = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def Start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='score-prefetch', daemon=True)
+        self._thread.start()
+
+    def Stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.RunOnce()
+            self._stop.wait(self.interval)
+
+    def _takeToken(self) -> bool:
+        now = monotonic()
+        self._tokens = min(self.budget_per_minute, self._tokens + (now - self._token_time) * self.budget_per_minute / 60)
+        self._token_time = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _isOvernight(self, now: datetime) -> bool:
+        if self.overnight_start <= self.overnight_end:
+            return self.overnight_start <= now.hour < self.overnight_end
+        return now.hour >= self.overnight_start or now.hour < self.overnight_end
+
+    def GetTasks(self, now: datetime) -> list[tuple[str, date, object]]:
+        today = now.date()
+        tasks = []
+
+        if self._isOvernight(now):
+            coming_day = today + timedelta(days=1) if now.hour >= self.overnight_start else today
+            for league in ['mlb', 'nba']:
+                tasks.append((league, coming_day, 'overnight'))
+
+        seen_weeks = set()
+        for offset in range(1, self.nfl_days_ahead + 1):
+            day = today + timedelta(days=offset)
+            try:
+                week = FindNearestWeek(day)
+            except (ValueError, KeyError):
+                continue
+            if week is None or repr(week) in seen_weeks:
+                continue
+            seen_weeks.add(repr(week))
+            tasks.append(('nfl', day, repr(week)))
+
+        for league in ['mlb', 'nba', 'nfl']:
+            # Callers asking for the default slate cache it under key 0, so it gets its own refresh, tagged 'default'
+            cache = getattr(self.loader, f'{league}_scores')
+            for key, tag in [(today, None), (0, 'default')]:
+                starts = set()
+                for score in cache.get(key, []):
+                    if not isinstance(score, Scorecard) or score.score_team1 is not None:
+                        continue
+                    start = score.getScheduledStart()
+                    if start is not None and start - timedelta(seconds=self.start_lead) <= now < start:
+                        starts.add(start)
+                for start in sorted(starts):
+                    tasks.append((league, today, start if tag is None else (tag, start)))
+
+        return [task for task in tasks if task not in self._done]
+
+    def RunOnce(self, now: datetime = None) -> list[tuple[str, date, object]]:
+        if now is None:
+            now = datetime.now().astimezone()
+
+        self._done = {task for task in self._done if task[1] >= now.date()}
+
+        completed = []
+        for task in self.GetTasks(now):
+            league, day, reason = task
+            default = isinstance(reason, tuple)
+            refresh = default or isinstance(reason, datetime)
+            if not refresh and self.loader.IsCacheFresh(league, day):
+                self._done.add(task)
+                continue
+
+            if not self.loader.IsLeagueIdle(league, self.idle_seconds) or not self._takeToken():
+                self.deferred += 1
+                continue
+
+            try:
+                if refresh:
+                    self.loader.RefreshScores(league, day, default)
+                else:
+                    getattr(self.loader, f'Get{str.upper(league)}Scores')(day)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+                warnings.warn(f'Failed to prefetch {league} scores for {day}: {e}')
+                continue
+
+            self.prefetches += 1
+            self._done.add(task)
+            completed.append(task)
+
+        return completed
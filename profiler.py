@@ -0,0 +1,233 @@
+"""
+Contains the SamplingProfiler class, an opt-in sampling profiler for finding the hot frames of a slow ScoreLoader refresh in production.
+While a profiler is running, ScoreLoader tags each thread with the league it is loading, and a background thread samples the stacks of tagged threads.
+Profiling stops by itself after a bounded window, then writes one collapsed-stack file per league (the input format of flamegraph.pl and speedscope) and a summary of the top frames of each league.
+
+The sampling interval adapts so that the time spent sampling stays under max_overhead, a fraction of wall time.
+Setting the SCORES_PROFILE environment variable to an output directory (optionally with SCORES_PROFILE_SECONDS and SCORES_PROFILE_OVERHEAD) starts a profiler when scores is imported.
+
+Running this module profiles repeated refreshes of every league, replayed from a cassette as fast as possible or paced by the loader's rate limit against the live sites.
+
+Usage: python profiler.py OUT_DIR --seconds 30 [--day 2024-07-04] [--cassette CASSETTE]
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from datetime import date
+from time import perf_counter, sleep
+
+_tags = {}
+_profiler = None
+_profiler_lock = threading.Lock()
+_untagged = nullcontext()
+
+class _LeagueTag:
+    def __init__(self, league: str) -> None:
+        self.league = league
+        self.previous = None
+
+    def __enter__(self) -> None:
+        ident = threading.get_ident()
+        self.previous = _tags.get(ident)
+        _tags[ident] = self.league
+
+    def __exit__(self, *exc) -> None:
+        ident = threading.get_ident()
+        if self.previous is None:
+            _tags.pop(ident, None)
+        else:
+            _tags[ident] = self.previous
+
+def Sampling(league: str) -> (_LeagueTag | nullcontext):
+    # Costs a single global lookup when no profiler is running
+    if _profiler is None:
+        return _untagged
+    return _LeagueTag(league)
+
+class SamplingProfiler:
+    def __init__(self, out_dir: str, duration: float = 60, interval: float = 0.01, max_overhead: float = 0.02, top: int = 20) -> None:
+        if not 0 < max_overhead < 1:
+            raise ValueError('max_overhead must be between 0 and 1')
+
+        self.out_dir = out_dir
+        self.duration = duration
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.top = top
+
+        self.samples = 0
+        self.sampling_time = 0
+        self.elapsed = 0
+        self.stacks = {}
+
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _label(self, code) -> str:
+        try:
+            return self._labels[code]
+        except KeyError:
+            label = f'{os.path.basename(code.co_filename)}:{code.co_name}'
+            self._labels[code] = label
+            return label
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        for ident, league in list(_tags.items()):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks.setdefault(league, Counter())[';'.join(stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        start = perf_counter()
+        end = start + self.duration
+        try:
+            while not self._stop.is_set() and perf_counter() < end:
+                sample_start = perf_counter()
+                self._sample()
+                cost = perf_counter() - sample_start
+                self.sampling_time += cost
+
+                # Wait long enough that sampling stays under the overhead cap, both for this sample and overall
+                wait_time = max(self.interval, cost * (1 - self.max_overhead) / self.max_overhead)
+                wait_time = max(wait_time, self.sampling_time / self.max_overhead - (perf_counter() - start))
+                self._stop.wait(wait_time)
+        finally:
+            self.elapsed = perf_counter() - start
+            self.Write()
+            _finish(self)
+
+    def Start(self) -> 'SamplingProfiler':
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def Stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def IsRunning(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def GetOverhead(self) -> float:
+        if self.elapsed == 0:
+            return 0
+        return self.sampling_time / self.elapsed
+
+    def GetSummary(self, top: int = None) -> dict[str, dict]:
+        top = self.top if top is None else top
+        summary = {}
+        for league, stacks in self.stacks.items():
+            own = Counter()
+            total = Counter()
+            for stack, count in stacks.items():
+                frames = stack.split(';')
+                own[frames[-1]] += count
+                for frame in set(frames):
+                    total[frame] += count
+            summary[league] = {
+                'samples' : sum(stacks.values()),
+                'self' : own.most_common(top),
+                'total' : total.most_common(top)
+            }
+        return summary
+
+    def Write(self) -> None:
+        os.makedirs(self.out_dir, exist_ok=True)
+        for league, stacks in self.stacks.items():
+            with open(os.path.join(self.out_dir, f'{league}.collapsed'), 'w') as file:
+                for stack, count in stacks.most_common():
+                    file.write(f'{stack} {count}\n')
+
+        with open(os.path.join(self.out_dir, 'summary.txt'), 'w') as file:
+            file.write(f'{self.samples} samples over {self.elapsed:.1f}s, {self.GetOverhead():.2%} overhead\n')
+            for league, league_summary in self.GetSummary().items():
+                file.write(f'\n{league}: {league_summary["samples"]} samples\n')
+                for heading in ('self', 'total'):
+                    file.write(f'  top frames by {heading} samples:\n')
+                    for frame, count in league_summary[heading]:
+                        file.write(f'    {count / league_summary["samples"]:7.2%}  {frame}\n')
+
+def _finish(profiler: SamplingProfiler) -> None:
+    global _profiler
+    with _profiler_lock:
+        if _profiler is profiler:
+            _profiler = None
+            _tags.clear()
+
+def Start(out_dir: str, duration: float = 60, interval: float = 0.01, max_overhead: float = 0.02, top: int = 20) -> SamplingProfiler:
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            raise RuntimeError('A profiler is already running')
+        _profiler = SamplingProfiler(out_dir, duration, interval, max_overhead, top)
+        return _profiler.Start()
+
+def Stop() -> (SamplingProfiler | None):
+    profiler = _profiler
+    if profiler is not None:
+        profiler.Stop()
+    return profiler
+
+def StartFromEnvironment() -> SamplingProfiler:
+    out_dir = os.environ['SCORES_PROFILE']
+    duration = float(os.environ.get('SCORES_PROFILE_SECONDS', 60))
+    max_overhead = float(os.environ.get('SCORES_PROFILE_OVERHEAD', 0.02))
+
+    profiler = Start(out_dir, duration, max_overhead=max_overhead)
+    atexit.register(profiler.Stop)
+    return profiler
+
+def main() -> None:
+    from cassette import CassettePlayer
+    from scores import ScoreLoader
+
+    parser = argparse.ArgumentParser(description='Profile repeated ScoreLoader refreshes of every league.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--day', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--max-overhead', type=float, default=0.02)
+    parser.add_argument('--cassette', default=None, help='replay recorded responses instead of requesting the live sites')
+    args = parser.parse_args()
+
+    loader = ScoreLoader()
+    if args.cassette is None:
+        # Against the live sites, the loader's own throttle paces the refreshes
+        replay = nullcontext()
+    else:
+        loader.requests_per_minute = 0
+        replay = CassettePlayer(args.cassette)
+
+    refreshes = 0
+    with replay:
+        profiler = Start(args.out_dir, args.seconds, max_overhead=args.max_overhead)
+        while profiler.IsRunning():
+            for league in ('mlb', 'nba', 'nfl'):
+                try:
+                    loader.RefreshScores(league,args.day)
+                except Exception as e:
+                    print(f'{league}: {e}')
+                    sleep(1)
+                refreshes += 1
+        profiler.Stop()
+
+    print(f'{refreshes} refreshes, {profiler.samples} samples, {profiler.GetOverhead():.2%} overhead')
+    with open(os.path.join(args.out_dir, 'summary.txt')) as file:
+        print(file.read())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+"""
+Contains the ScoreArchive and ArchiveWriter classes, which store scorecards in a compact, append-only binary file.
+Archives are opened through mmap, so looking up a single date or scanning a range of dates only touches the pages holding those records.
+
+File layout (all integers little-endian):
+    header      b'SSAR', u16 version, u16 reserved
+    blocks      4 byte tag, u32 payload length, payload
+                STRS - u32 first string id, u32 count, then count entries of u16 length + utf-8 bytes
+                RECS - u32 date ordinal, u8 league, 3 pad bytes, u32 count, then count fixed-width records
+                       (string ids of the away name and abbreviation, home name and abbreviation, i32 away and home scores,
+                       string id of the state, and from version 2 an i64 start time in UTC epoch seconds)
+                INDX - u32 string block count, u64 offsets, u32 entry count, entries of (u32 date ordinal, u8 league, u64 offset, u32 count)
+    trailer     u64 offset of the last INDX block, b'SSIX'
+
+Appending never rewrites existing bytes: new blocks are written after the old trailer, followed by a fresh index and trailer.
+If the trailer is missing (e.g. the writer was interrupted), the index is rebuilt by walking the block headers.
+When the same league and date is written more than once, the most recent block is the one returned.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import warnings
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter
+from typing import Iterator
+
+from scorecard import Scorecard, FromDict
+
+_magic = b'SSAR'
+_version = 2
+_trailer_magic = b'SSIX'
+
+_header = struct.Struct('<4sHH')
+_block_header = struct.Struct('<4sI')
+_strings_header = struct.Struct('<II')
+_string_length = struct.Struct('<H')
+_records_header = struct.Struct('<IB3xI')
+_records = {
+    1 : struct.Struct('<IIIIiiI'),
+    2 : struct.Struct('<IIIIiiIq')
+}
+_index_count = struct.Struct('<I')
+_index_offset = struct.Struct('<Q')
+_index_entry = struct.Struct('<IB3xQI')
+_trailer = struct.Struct('<Q4s')
+
+_no_string = 0xFFFFFFFF
+_no_score = -2**31
+_no_start_time = -2**63
+
+_leagues = ['mlb', 'nba', 'nfl']
+
+class ArchiveError(ValueError):
+    pass
+
+def _leagueId(league: str) -> int:
+    try:
+        return _leagues.index(str.lower(league))
+    except ValueError:
+        raise ValueError(f'Unknown league: {league}')
+
+class ScoreArchive:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.strings = []
+        self.string_blocks = []
+        self.index = {}
+        self.valid_length = 0
+
+        self._file = open(filename, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _header.size:
+            self._file.close()
+            raise ArchiveError('File is too small to be a score archive')
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _ = _header.unpack_from(self._map, 0)
+        if magic != _magic:
+            self.Close()
+            raise ArchiveError('File is not a score archive')
+        if version not in _records:
+            self.Close()
+            raise ArchiveError(f'Unsupported archive version {version}')
+        self.version = version
+        self._record = _records[version]
+
+        if not self._loadIndex(size):
+            self._scanBlocks(size)
+
+        self._keys = sorted(self.index.keys())
+
+    def __enter__(self) -> 'ScoreArchive':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Close()
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self.index.values())
+
+    def Close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _readStrings(self, offset: int) -> None:
+        first_id, count = _strings_header.unpack_from(self._map, offset)
+        if first_id != len(self.strings):
+            raise ArchiveError('String table is out of order')
+        offset += _strings_header.size
+        for _ in range(count):
+            length, = _string_length.unpack_from(self._map, offset)
+            offset += _string_length.size
+            self.strings.append(self._map[offset:offset + length].decode('utf-8'))
+            offset += length
+
+    def _loadIndex(self, size: int) -> bool:
+        if size < _header.size + _block_header.size + _trailer.size:
+            return False
+
+        index_offset, magic = _trailer.unpack_from(self._map, size - _trailer.size)
+        if magic != _trailer_magic or index_offset < _header.size or index_offset >= size - _trailer.size:
+            return False
+
+        tag, length = _block_header.unpack_from(self._map, index_offset)
+        if tag != b'INDX' or index_offset + _block_header.size + length != size - _trailer.size:
+            return False
+
+        offset = index_offset + _block_header.size
+        block_count, = _index_count.unpack_from(self._map, offset)
+        offset += _index_count.size
+        for _ in range(block_count):
+            block_offset, = _index_offset.unpack_from(self._map, offset)
+            offset += _index_offset.size
+            self.string_blocks.append(block_offset)
+            self._readStrings(block_offset)
+
+        entry_count, = _index_count.unpack_from(self._map, offset)
+        offset += _index_count.size
+        for _ in range(entry_count):
+            ordinal, league, record_offset, count = _index_entry.unpack_from(self._map, offset)
+            offset += _index_entry.size
+            self.index[(ordinal, league)] = (record_offset, count)
+
+        self.valid_length = size
+        return True
+
+    def _scanBlocks(self, size: int) -> None:
+        offset = _header.size
+        while offset + _block_header.size <= size:
+            tag, length = _block_header.unpack_from(self._map, offset)
+            payload = offset + _block_header.size
+            if payload + length > size:
+                break
+
+            if tag == b'STRS':
+                self.string_blocks.append(payload)
+                self._readStrings(payload)
+            elif tag == b'RECS':
+                ordinal, league, count = _records_header.unpack_from(self._map, payload)
+                self.index[(ordinal, league)] = (payload + _records_header.size, count)
+            elif tag != b'INDX':
+                break
+
+            offset = payload + length
+            if tag == b'INDX' and offset + _trailer.size <= size:
+                _, magic = _trailer.unpack_from(self._map, offset)
+                if magic == _trailer_magic:
+                    offset += _trailer.size
+
+        self.valid_length = offset
+
+    def _string(self, string_id: int) -> str:
+        if string_id == _no_string:
+            return None
+        return self.strings[string_id]
+
+    def _readRecords(self, ordinal: int, offset: int, count: int) -> list[Scorecard]:
+        day = date.fromordinal(ordinal)
+        data = self._map[offset:offset + count * self._record.size]
+
+        cards = []
+        for record in self._record.iter_unpack(data):
+            away_name, away_abbr, home_name, home_abbr, away_score, home_score, state = record[:7]
+            card = Scorecard()
+            card.setNames(self._string(away_name),self._string(home_name))
+            card.setAbbrs(self._string(away_abbr),self._string(home_abbr))
+            if away_score != _no_score and home_score != _no_score:
+                card.setScore(away_score,home_score)
+            card.setState(self._string(state))
+            card.setDate(day)
+            if len(record) > 7 and record[7] != _no_start_time:
+                card.setStartTime(datetime.fromtimestamp(record[7], timezone.utc))
+            cards.append(card)
+
+        return cards
+
+    def GetDates(self, league: str = None) -> list[date]:
+        league_id = None if league is None else _leagueId(league)
+        days = []
+        for ordinal, key_league in self._keys:
+            if league_id is not None and key_league != league_id:
+                continue
+            if len(days) == 0 or days[-1] != ordinal:
+                days.append(ordinal)
+        return [date.fromordinal(ordinal) for ordinal in days]
+
+    def GetScores(self, day: date, league: str) -> list[Scorecard]:
+        if not isinstance(day,date):
+            raise TypeError('Expected datetime.date object')
+
+        key = (day.toordinal(), _leagueId(league))
+        try:
+            offset, count = self.index[key]
+        except KeyError:
+            return []
+        return self._readRecords(key[0], offset, count)
+
+    def ScanRange(self, start: date, end: date, league: str = None) -> Iterator[tuple[str, Scorecard]]:
+        if not (isinstance(start,date) and isinstance(end,date)):
+            raise TypeError('Expected datetime.date object')
+
+        league_id = None if league is None else _leagueId(league)
+        low = bisect_left(self._keys, (start.toordinal(), 0))
+        high = bisect_right(self._keys, (end.toordinal(), len(_leagues)))
+
+        for ordinal, key_league in self._keys[low:high]:
+            if league_id is not None and key_league != league_id:
+                continue
+            offset, count = self.index[(ordinal, key_league)]
+            for card in self._readRecords(ordinal, offset, count):
+                yield _leagues[key_league], card
+
+class ArchiveWriter:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.string_ids = {}
+        self.string_blocks = []
+        self.index = {}
+
+        exists = os.path.exists(filename) and os.path.getsize(filename) > 0
+        if exists:
+            with ScoreArchive(filename) as archive:
+                self.string_ids = {string: string_id for string_id, string in enumerate(archive.strings)}
+                self.string_blocks = list(archive.string_blocks)
+                self.index = dict(archive.index)
+                valid_length = archive.valid_length
+                self.version = archive.version
+
+            self._file = open(filename, 'r+b')
+            self._file.truncate(valid_length)
+            self._file.seek(valid_length)
+        else:
+            self.version = _version
+            self._file = open(filename, 'wb')
+            self._file.write(_header.pack(_magic, _version, 0))
+        self._record = _records[self.version]
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.Close()
+
+    def _writeBlock(self, tag: bytes, payload: bytes) -> int:
+        offset = self._file.tell()
+        self._file.write(_block_header.pack(tag, len(payload)))
+        self._file.write(payload)
+        return offset + _block_header.size
+
+    def _stringId(self, string: str, new_strings: list[str]) -> int:
+        if string is None:
+            return _no_string
+        string = str(string)
+        try:
+            return self.string_ids[string]
+        except KeyError:
+            string_id = len(self.string_ids)
+            self.string_ids[string] = string_id
+            new_strings.append(string)
+            return string_id
+
+    def _writeStrings(self, new_strings: list[str]) -> None:
+        first_id = len(self.string_ids) - len(new_strings)
+        parts = [_strings_header.pack(first_id, len(new_strings))]
+        for string in new_strings:
+            encoded = string.encode('utf-8')
+            if len(encoded) > 0xFFFF:
+                raise ArchiveError('String is too long to archive')
+            parts.append(_string_length.pack(len(encoded)))
+            parts.append(encoded)
+        self.string_blocks.append(self._writeBlock(b'STRS', b''.join(parts)))
+
+    def AddScores(self, league: str, day: date, scores: list[Scorecard]) -> None:
+        if not isinstance(day,date):
+            raise TypeError('Expected datetime.date object')
+        league_id = _leagueId(league)
+
+        new_strings = []
+        records = []
+        for score in scores:
+            if not isinstance(score, Scorecard):
+                continue
+            away_score = _no_score if score.score_team1 is None else score.score_team1
+            home_score = _no_score if score.score_team2 is None else score.score_team2
+            fields = [
+                self._stringId(score.name_team1, new_strings),
+                self._stringId(score.abbr_team1, new_strings),
+                self._stringId(score.name_team2, new_strings),
+                self._stringId(score.abbr_team2, new_strings),
+                away_score,
+                home_score,
+                self._stringId(score.game_state, new_strings)
+            ]
+            if self.version >= 2:
+                fields.append(_no_start_time if score.start_time is None else int(score.start_time.timestamp()))
+            records.append(self._record.pack(*fields))
+
+        if len(new_strings) > 0:
+            self._writeStrings(new_strings)
+
+        payload = _records_header.pack(day.toordinal(), league_id, len(records)) + b''.join(records)
+        offset = self._writeBlock(b'RECS', payload)
+        self.index[(day.toordinal(), league_id)] = (offset + _records_header.size, len(records))
+
+    def Close(self) -> None:
+        if self._file.closed:
+            return
+
+        parts = [_index_count.pack(len(self.string_blocks))]
+        parts += [_index_offset.pack(offset) for offset in self.string_blocks]
+        parts.append(_index_count.pack(len(self.index)))
+        for (ordinal, league_id), (offset, count) in sorted(self.index.items()):
+            parts.append(_index_entry.pack(ordinal, league_id, offset, count))
+
+        index_offset = self._writeBlock(b'INDX', b''.join(parts)) - _block_header.size
+        self._file.write(_trailer.pack(index_offset, _trailer_magic))
+        self._file.close()
+
+def ConvertJsonDump(json_filenames: str | list[str], archive_filename: str) -> int:
+    if isinstance(json_filenames, str):
+        json_filenames = [json_filenames]
+
+    written = 0
+    with ArchiveWriter(archive_filename) as writer:
+        for json_filename in json_filenames:
+            with open(json_filename) as file:
+                dump = json.load(file)
+
+            dump_date = dump.get('date')
+            fallback_date = None
+            if dump_date is not None and dump_date != 'None':
+                fallback_date = date.fromisoformat(dump_date)
+
+            for league, score_dicts in dump['scores'].items():
+                by_date = {}
+                for score_dict in score_dicts:
+                    card = FromDict(score_dict)
+                    if card.date is None:
+                        card.setDate(fallback_date)
+                    if card.date is None:
+                        warnings.warn(f'Skipping {league} score without a date in {json_filename}')
+                        continue
+                    by_date.setdefault(card.date, []).append(card)
+
+                for day, cards in by_date.items():
+                    writer.AddScores(league, day, cards)
+                    written += len(cards)
+
+    return written
+
+def BenchmarkArchive(filename: str, lookups: int = 1000) -> dict:
+    start = perf_counter()
+    archive = ScoreArchive(filename)
+    open_time = perf_counter() - start
+
+    try:
+        days = archive.GetDates()
+        if len(days) == 0:
+            raise ArchiveError('Archive is empty')
+
+        start = perf_counter()
+        step = max(1, len(days) // lookups)
+        lookup_count = 0
+        for day in days[::step][:lookups]:
+            for league in _leagues:
+                archive.GetScores(day, league)
+            lookup_count += 1
+        lookup_time = perf_counter() - start
+
+        start = perf_counter()
+        scanned = sum(1 for _ in archive.ScanRange(days[0], days[-1]))
+        scan_time = perf_counter() - start
+    finally:
+        archive.Close()
+
+    return {
+        'records' : scanned,
+        'file_bytes' : os.path.getsize(filename),
+        'open_seconds' : open_time,
+        'date_lookups_per_second' : lookup_count / lookup_time if lookup_time > 0 else float('inf'),
+        'scan_records_per_second' : scanned / scan_time if scan_time > 0 else float('inf')
+    }
+
+def _syntheticDump(first_season: int, seasons: int, games_per_day: int) -> list[dict]:
+    teams = [(f'Team {n}', f'T{n:02d}') for n in range(30)]
+    dumps = []
+    for season in range(first_season, first_season + seasons):
+        day = date(season, 4, 1)
+        for day_num in range(180):
+            scores = []
+            for game in range(games_per_day):
+                away = teams[(day_num + game * 2) % len(teams)]
+                home = teams[(day_num + game * 2 + 1) % len(teams)]
+                scores.append({
+                    'away_team_name' : away[0],
+                    'away_team_abbr' : away[1],
+                    'away_team_score' : (day_num + game) % 11,
+                    'home_team_name' : home[0],
+                    'home_team_abbr' : home[1],
+                    'home_team_score' : (day_num * game) % 9,
+                    'game_state' : 'Final',
+                    'game_date' : str(day)
+                })
+            dumps.append({'scores' : {'mlb' : scores, 'nba' : [], 'nfl' : []}, 'date' : str(day)})
+            day += timedelta(days=1)
+    return dumps
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        dump_filename = os.path.join(directory, 'scores.json')
+        archive_filename = os.path.join(directory, 'scores.ssar')
+
+        dumps = _syntheticDump(1901, 50, 15)
+        with open(dump_filename, 'w') as file:
+            json.dump({'dumps' : dumps}, file)
+
+        start = perf_counter()
+        with open(dump_filename) as file:
+            loaded = json.load(file)['dumps']
+        json_time = perf_counter() - start
+
+        dump_filenames = []
+        for n, dump in enumerate(loaded):
+            part_filename = os.path.join(directory, f'part{n}.json')
+            with open(part_filename, 'w') as file:
+                json.dump(dump, file)
+            dump_filenames.append(part_filename)
+
+        start = perf_counter()
+        written = ConvertJsonDump(dump_filenames, archive_filename)
+        convert_time = perf_counter() - start
+
+        results = BenchmarkArchive(archive_filename)
+
+        print(f'JSON dump: {os.path.getsize(dump_filename)} bytes, {json_time:.3f}s to load')
+        print(f'Converted {written} scores in {convert_time:.3f}s')
+        print(f'Archive: {results["file_bytes"]} bytes, {results["open_seconds"] * 1000:.2f}ms to open')
+        print(f'Date lookups: {results["date_lookups_per_second"]:.0f}/s')
+        print(f'Range scan: {results["scan_records_per_second"]:.0f} records/s')
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
 """
 Contains the Scorecard class which stores the data of the score from any given game.
-Scorecard contains team names, abbreviations, scores, game status, and the date the game was played. Some or all fields may be set to None.
+Scorecard contains team names, abbreviations, scores, game status, the date the game was played, and its timezone-aware start time. Some or all fields may be set to None.
 """
 
-from datetime import date
+import re
+from datetime import date, datetime, timezone, tzinfo
+from zoneinfo import ZoneInfo
 try:
     import pandas as pd
     pd_enabled = True
@@ -11,6 +13,10 @@ except ImportError | ModuleNotFoundError as e:
     pd_exception = e
     pd_enabled = False
 
+eastern = ZoneInfo('America/New_York')
+_scheduled_time_pattern = re.compile(r'^(\d{1,2}):(\d{2}) (am|pm) ET$')
+_no_start_time = datetime.max.replace(tzinfo=timezone.utc)
+
 class Scorecard:
     def __init__(self) -> None:
         self.name_team1 = None
@@ -25,6 +31,7 @@ class Scorecard:
         self.game_state = None
 
         self.date = None
+        self.start_time = None
 
     def __repr__(self) -> str:
         score_str = ""
@@ -87,6 +94,29 @@ class Scorecard:
     def setDate(self, day: date) -> None:
         self.date = day
 
+    def setStartTime(self, start_time: datetime) -> None:
+        if start_time is not None and start_time.tzinfo is None:
+            raise ValueError('Start time must be timezone-aware')
+        self.start_time = start_time
+
+    def getScheduledStart(self) -> (datetime | None):
+        if self.start_time is not None:
+            return self.start_time
+
+        if self.date is None or self.game_state is None:
+            return None
+
+        match = _scheduled_time_pattern.match(self.game_state)
+        if match is None:
+            return None
+
+        hour = int(match.group(1)) % 12
+        if match.group(3) == 'pm':
+            hour += 12
+        minute = int(match.group(2))
+
+        return datetime(self.date.year,self.date.month,self.date.day,hour,minute,tzinfo=eastern)
+
     def getDict(self) -> dict:
         return {
             'away_team_name' : self.name_team1,
@@ -96,7 +126,8 @@ class Scorecard:
             'home_team_abbr' : self.abbr_team2,
             'home_team_score' : self.score_team2,
             'game_state' : self.game_state,
-            'game_date' : str(self.date)
+            'game_date' : str(self.date),
+            'start_time' : None if self.start_time is None else self.start_time.isoformat()
         }
     
     def getSeries(self) -> pd.Series:
@@ -104,4 +135,36 @@ class Scorecard:
         if pd_enabled:
             ds = pd.Series(score_dict,index=score_dict.keys())
             return ds
-        raise pd_exception
\ No newline at end of file
+        raise pd_exception
+
+def FromDict(score_dict: dict) -> Scorecard:
+    card = Scorecard()
+    card.setNames(score_dict.get('away_team_name'),score_dict.get('home_team_name'))
+    card.setAbbrs(score_dict.get('away_team_abbr'),score_dict.get('home_team_abbr'))
+    card.setScore(score_dict.get('away_team_score'),score_dict.get('home_team_score'))
+    card.setState(score_dict.get('game_state'))
+
+    date_text = score_dict.get('game_date')
+    if date_text is not None and date_text != 'None':
+        card.setDate(date.fromisoformat(date_text))
+
+    card.setStartTime(ParseStartTime(score_dict.get('start_time')))
+
+    return card
+
+def ParseStartTime(text: str, zone: tzinfo = timezone.utc) -> (datetime | None):
+    if text is None or text == '' or text == 'None':
+        return None
+
+    start_time = datetime.fromisoformat(text.removesuffix('Z'))
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=zone)
+    return start_time
+
+def ToEastern(start_time: datetime) -> datetime:
+    return start_time.astimezone(eastern)
+
+def StartTimeKey(score: Scorecard) -> datetime:
+    if score.start_time is None:
+        return _no_start_time
+    return score.start_time
\ No newline at end of file
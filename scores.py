@@ -5,9 +5,16 @@ The main library for the score aggregator. Contains the ScoreLoader class, which
 from mlb_scores import GetScoresOnDay as _getMLBScores
 from nba_scores import GetScores as _getNBAScores
 from nfl_scores import GetScores as _getNFLScores
+from nfl_week import FindNearestWeek, NFLWeek
+from profiler import Sampling, StartFromEnvironment
 from scorecard import Scorecard
+from score_archive import ArchiveWriter
+from shared_cache import SharedScoreCache, SharedKey, RequestBudgetExhausted
+from timeline import IsFinal
 
-from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timezone
+from threading import Lock
 from time import time, sleep
 
 try:
@@ -18,12 +25,22 @@ except ModuleNotFoundError | ImportError as e:
     pd_enabled = False
 
 import json
+import os
+
+_league_loaders = {
+    'mlb' : _getMLBScores,
+    'nba' : _getNBAScores,
+    'nfl' : _getNFLScores
+}
+
+if os.environ.get('SCORES_PROFILE'):
+    StartFromEnvironment()
 
 class LoadError(LookupError):
     pass
 
 class ScoreLoader:
-    def __init__(self) -> None:
+    def __init__(self, shared_cache: SharedScoreCache = None) -> None:
         self.mlb_scores = {}
         self.nba_scores = {}
         self.nfl_scores = {}
@@ -33,115 +50,252 @@ class ScoreLoader:
         self.last_nba_load_time = 0
         self.last_nfl_load_time = 0
 
+        self.cache_times = {league : {} for league in _league_loaders}
+        self.cache_max_age = 0
+        self.pregame_cache_max_age = 0
+        self.cache_final_slates = False
+
+        self.shared_cache = shared_cache
+        if shared_cache is not None:
+            shared_cache.InstallBudget()
+        self.change_log = None
+
         self.loaded_scores = {}
 
+        self._league_locks = {league : Lock() for league in _league_loaders}
+        self._refresh_lock = Lock()
+        self._refreshes = {}
+        self._executors = {}
+
+    def _timeSinceLastLoad(self, league: str) -> float:
+        return time() - getattr(self, f'last_{league}_load_time')
+
     def _timeSinceMLBLastLoad(self) -> float:
-        return time() - self.last_mlb_load_time
+        return self._timeSinceLastLoad('mlb')
     
     def _timeSinceNBALastLoad(self) -> float:
-        return time() - self.last_nba_load_time
+        return self._timeSinceLastLoad('nba')
     
     def _timeSinceNFLLastLoad(self) -> float:
-        return time() - self.last_nfl_load_time
+        return self._timeSinceLastLoad('nfl')
 
-    def GetMLBScores(self, day: date, default: bool = False) -> list[Scorecard]:
-        if not (default or isinstance(day,date)):
-            raise TypeError('Expected datetime.date object')
+    def _cacheKey(self, league: str, day: date, default: bool) -> (date | NFLWeek | int):
+        if default:
+            return 0
 
-        if self._timeSinceMLBLastLoad() < self.requests_per_minute / 60:
+        # Any day other than today returns its whole NFL week, so the week is cached once
+        if league == 'nfl' and day != date.today():
             try:
-                if default:
-                    return self.mlb_scores[0]
-                else:
-                    return self.mlb_scores[day]
-            except KeyError:
-                wait_time = self.requests_per_minute / 60 - self._timeSinceMLBLastLoad()
-                sleep(wait_time)
-                scores =  _getMLBScores(day,default)
-                if default:
-                    self.mlb_scores[0] = scores
-                else:
-                    self.mlb_scores[day] = scores
-                self.last_mlb_load_time = time()
+                week = FindNearestWeek(day)
+            except (ValueError, KeyError):
+                week = None
+            if week is not None:
+                return week
+
+        return day
+
+    def _isCacheFresh(self, league: str, key: date | NFLWeek | int) -> bool:
+        cache = getattr(self, f'{league}_scores')
+        if key not in cache:
+            return False
+
+        age = time() - self.cache_times[league].get(key, 0)
+        if age <= self.cache_max_age:
+            return True
+
+        # A past slate where every game is final will not change again
+        scores = [score for score in cache[key] if isinstance(score, Scorecard)]
+        if self.cache_final_slates and key != 0 and len(scores) > 0 and all(IsFinal(score) for score in scores):
+            return True
+        if age > self.pregame_cache_max_age:
+            return False
+
+        # A slate where no game has started stays valid until the first scheduled start
+        if len(scores) == 0 or any(score.score_team1 is not None for score in scores):
+            return False
+        starts = [score.getScheduledStart() for score in scores]
+        if None in starts:
+            return False
+        return datetime.now(timezone.utc) < min(starts)
+
+    def _cacheScores(self, league: str, key: date | NFLWeek | int, scores: list[Scorecard], load_time: float) -> None:
+        getattr(self, f'{league}_scores')[key] = scores
+        self.cache_times[league][key] = load_time
+        if self.change_log is not None:
+            self.change_log.Record(league,scores,load_time)
+
+    def _getSharedScores(self, league: str, day: date, default: bool, key: date | NFLWeek | int, force: bool) -> list[Scorecard]:
+        shared_key = SharedKey(key)
+        min_interval = self.requests_per_minute / 60
+
+        since = None
+        entry = self.shared_cache.Get(league,shared_key)
+        if entry is not None:
+            scores, since = entry
+            self._cacheScores(league,key,scores,since)
+            if not force and (time() - since < min_interval or self._isCacheFresh(league,key)):
                 return scores
-        else:
-            scores =  _getMLBScores(day,default)
-            if default:
-                self.mlb_scores[0] = scores
-            else:
-                self.mlb_scores[day] = scores
-            self.last_mlb_load_time = time()
+
+        # Only the lease holder refreshes; everyone else waits for its result
+        if not self.shared_cache.AcquireLease(league,shared_key):
+            entry = self.shared_cache.WaitForUpdate(league,shared_key,since,self.shared_cache.lease_seconds)
+            if entry is not None:
+                scores, updated = entry
+                self._cacheScores(league,key,scores,updated)
+                return scores
+
+        try:
+            try:
+                scores = _league_loaders[league](day,default)
+            except RequestBudgetExhausted as e:
+                if since is not None:
+                    return getattr(self, f'{league}_scores')[key]
+                raise LoadError(str(e))
+
+            updated = self.shared_cache.Put(league,shared_key,scores)
+            self._cacheScores(league,key,scores,updated)
+            setattr(self, f'last_{league}_load_time', updated)
             return scores
+        finally:
+            self.shared_cache.ReleaseLease(league,shared_key)
 
-    def GetNFLScores(self, day: date, default: bool = False) -> list[Scorecard]:
+    def _getScores(self, league: str, day: date, default: bool, force: bool = False) -> list[Scorecard]:
         if not (default or isinstance(day,date)):
             raise TypeError('Expected datetime.date object')
 
-        if self._timeSinceNFLLastLoad() < self.requests_per_minute / 60:
-            try:
-                if default:
-                    return self.nfl_scores[0]
-                else:
-                    return self.nfl_scores[day]
-            except KeyError:
-                wait_time = self.requests_per_minute / 60 - self._timeSinceNFLLastLoad()
-                sleep(wait_time)
-                scores =  _getNFLScores(day,default=default)
-                if default:
-                    self.nfl_scores[0] = scores
-                else:
-                    self.nfl_scores[day] = scores
-                self.last_nfl_load_time = time()
-                return scores
-        else:
-            scores =  _getNFLScores(day,default=default)
-            if default:
-                self.nfl_scores[0] = scores
-            else:
-                self.nfl_scores[day] = scores
-            self.last_nfl_load_time = time()
-            return scores        
+        cache = getattr(self, f'{league}_scores')
+        key = self._cacheKey(league,day,default)
+        min_interval = self.requests_per_minute / 60
+
+        with Sampling(league), self._league_locks[league]:
+            if not force and self._isCacheFresh(league, key):
+                return cache[key]
+
+            if self.shared_cache is not None:
+                return self._getSharedScores(league,day,default,key,force)
+
+            time_since_load = self._timeSinceLastLoad(league)
+            if time_since_load < min_interval:
+                if key in cache and not force:
+                    return cache[key]
+                sleep(min_interval - time_since_load)
+
+            scores = _league_loaders[league](day,default)
+            load_time = time()
+            self._cacheScores(league,key,scores,load_time)
+            setattr(self, f'last_{league}_load_time', load_time)
+            return scores
+
+    def GetMLBScores(self, day: date, default: bool = False) -> list[Scorecard]:
+        return self._getScores('mlb',day,default)
+
+    def GetNFLScores(self, day: date, default: bool = False, filter_day: bool = False) -> list[Scorecard]:
+        scores = self._getScores('nfl',day,default)
+        if filter_day and not default:
+            return [score for score in scores if isinstance(score, Scorecard) and score.date == day]
+        return scores
 
     def GetNBAScores(self, day: date, default: bool = False) -> list[Scorecard]:
+        return self._getScores('nba',day,default)
+
+    def RefreshScores(self, league: str, day: date, default: bool = False) -> list[Scorecard]:
+        league = str.lower(league)
+        if league not in _league_loaders:
+            raise ValueError(f'Unknown league: {league}')
+        return self._getScores(league,day,default,force=True)
+
+    def GetCacheAge(self, league: str, day: date, default: bool = False) -> (float | None):
+        league = str.lower(league)
+        key = self._cacheKey(league,day,default)
+        try:
+            return time() - self.cache_times[league][key]
+        except KeyError:
+            return None
+
+    def IsCacheFresh(self, league: str, day: date, default: bool = False) -> bool:
+        league = str.lower(league)
+        return self._isCacheFresh(league,self._cacheKey(league,day,default))
+
+    def IsLeagueIdle(self, league: str, idle_seconds: float = 0) -> bool:
+        league = str.lower(league)
+        if self._league_locks[league].locked():
+            return False
+        return self._timeSinceLastLoad(league) >= idle_seconds
+
+    def _refreshInBackground(self, league: str, day: date, default: bool) -> Future:
+        refresh_key = (league, self._cacheKey(league,day,default))
+        with self._refresh_lock:
+            future = self._refreshes.get(refresh_key)
+            if future is not None and not future.done():
+                return future
+
+            # Each league gets its own worker, so a slow league never holds up the others
+            executor = self._executors.get(league)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'score-refresh-{league}')
+                self._executors[league] = executor
+            future = executor.submit(self._getScores, league, day, default)
+            self._refreshes[refresh_key] = future
+
+        # Added outside the lock, since the callback runs right away if the refresh has already finished
+        future.add_done_callback(lambda done: self._forgetRefresh(refresh_key,done))
+        return future
+
+    def _forgetRefresh(self, refresh_key: tuple, future: Future) -> None:
+        with self._refresh_lock:
+            if self._refreshes.get(refresh_key) is future:
+                del self._refreshes[refresh_key]
+
+    def LoadAllScores(self, day: date, default: bool = False, deadline: float = None, stale_while_revalidate: bool = False) -> dict:
+        '''
+        Loads the scores for every league into a scoreboard. The scoreboard's 'freshness' entry holds the age in seconds of each league's scores, whether they are stale, and the error that kept them from refreshing, if any.
+
+        With a deadline (in seconds), the leagues are refreshed in the background and any league that has not answered in time falls back to its last good scores.
+        With stale_while_revalidate, leagues with cached scores return them immediately while the refresh continues in the background.
+        '''
         if not (default or isinstance(day,date)):
             raise TypeError('Expected datetime.date object')
 
-        if self._timeSinceNBALastLoad() < self.requests_per_minute / 60:
-            try:
-                if default:
-                    return self.nba_scores[0]
-                else:
-                    return self.nba_scores[day]
-            except KeyError:
-                wait_time = self.requests_per_minute / 60 - self._timeSinceNBALastLoad()
-                sleep(wait_time)
-                scores =  _getNBAScores(day,default)
-                if default:
-                    self.nba_scores[0] = scores
-                else:
-                    self.nba_scores[day] = scores
-                self.last_nba_load_time = time()
-                return scores
+        scores = {}
+        freshness = {}
+
+        if deadline is None and not stale_while_revalidate:
+            for league in _league_loaders:
+                scores[league] = self._getScores(league,day,default)
+                freshness[league] = {'age' : self.GetCacheAge(league,day,default), 'stale' : False, 'error' : None}
         else:
-            scores =  _getNBAScores(day,default)
-            if default:
-                self.nba_scores[0] = scores
-            else:
-                self.nba_scores[day] = scores
-            self.last_nba_load_time = time()
-            return scores
-        
-    def LoadAllScores(self, day: date, default: bool = False) -> dict:
-        if not (default or isinstance(day,date)):
-            raise TypeError('Expected datetime.date object')
+            start = time()
+            refreshes = {league : self._refreshInBackground(league,day,default) for league in _league_loaders}
+
+            for league, refresh in refreshes.items():
+                cache = getattr(self, f'{league}_scores')
+                key = self._cacheKey(league,day,default)
+                stale = False
+                error = None
+
+                if stale_while_revalidate and not refresh.done() and key in cache:
+                    league_scores = cache[key]
+                    stale = True
+                else:
+                    remaining = None if deadline is None else max(0, deadline - (time() - start))
+                    try:
+                        league_scores = refresh.result(timeout=remaining)
+                    except FutureTimeoutError:
+                        error = 'Deadline exceeded'
+                    except Exception as e:
+                        error = str(e) or type(e).__name__
+
+                    if error is not None:
+                        league_scores = cache.get(key, [])
+                        stale = True
+
+                freshness[league] = {'age' : self.GetCacheAge(league,day,default), 'stale' : stale, 'error' : error}
+                scores[league] = league_scores
 
         scoreboard = {
-            'scores' : {
-                'mlb' : self.GetMLBScores(day,default),
-                'nba' : self.GetNBAScores(day,default),
-                'nfl' : self.GetNFLScores(day,default)
-            },
-            'date' : day
+            'scores' : scores,
+            'date' : day,
+            'freshness' : freshness
         }
 
         self.loaded_scores = scoreboard
@@ -194,3 +348,17 @@ class ScoreLoader:
         with open(filename,'w') as file:
             file.write(dump)
 
+    def DumpToArchive(self, filename: str) -> None:
+        if len(self.loaded_scores) <= 0:
+            raise LoadError('No loaded scores')
+
+        with ArchiveWriter(filename) as writer:
+            for league, scores in self.loaded_scores['scores'].items():
+                by_date = {}
+                for score in scores:
+                    if not isinstance(score, Scorecard) or score.date is None:
+                        continue
+                    by_date.setdefault(score.date, []).append(score)
+
+                for day, day_scores in by_date.items():
+                    writer.AddScores(league, day, day_scores)
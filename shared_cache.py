@@ -0,0 +1,173 @@
+"""
+Contains the SharedScoreCache class, a scoreboard cache kept in a WAL-mode SQLite file so that every process on a host can share it.
+A ScoreLoader given a SharedScoreCache reads scores other workers have already loaded, and only the worker holding a key's lease refreshes that key.
+Every HTTP request to a score site is also counted host-wide through a SharedBudgetTransport, so adding workers does not multiply the number of requests made to the score sites.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import date
+from time import time, sleep
+from urllib.parse import urlsplit
+
+import fetch
+
+from nfl_week import NFLWeek
+from scorecard import Scorecard, FromDict
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS scores (
+    league TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (league, key)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    league TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (league, key)
+);
+CREATE TABLE IF NOT EXISTS requests (
+    league TEXT NOT NULL,
+    sent REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_by_league ON requests (league, sent);
+'''
+
+class RequestBudgetExhausted(LookupError):
+    pass
+
+def SharedKey(key: date | NFLWeek | int) -> str:
+    if key == 0:
+        return 'default'
+    return str(key)
+
+class SharedScoreCache:
+    def __init__(self, filename: str, requests_per_minute: int = 30, lease_seconds: float = 30, poll_interval: float = 0.1) -> None:
+        self.filename = filename
+        self.requests_per_minute = requests_per_minute
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._connect().executescript(_schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections cannot cross a fork or be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        connection = sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _owner(self) -> str:
+        return f'{os.getpid()}:{threading.get_ident()}'
+
+    def Close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+    def Get(self, league: str, key: str) -> (tuple[list[Scorecard], float] | None):
+        row = self._connect().execute('SELECT payload, updated FROM scores WHERE league = ? AND key = ?', (league, key)).fetchone()
+        if row is None:
+            return None
+        payload, updated = row
+        return [FromDict(score_dict) for score_dict in json.loads(payload)], updated
+
+    def GetUpdated(self, league: str, key: str) -> (float | None):
+        row = self._connect().execute('SELECT updated FROM scores WHERE league = ? AND key = ?', (league, key)).fetchone()
+        return None if row is None else row[0]
+
+    def Put(self, league: str, key: str, scores: list[Scorecard]) -> float:
+        payload = json.dumps([score.getDict() for score in scores if isinstance(score, Scorecard)], separators=(',', ':'))
+        updated = time()
+        self._connect().execute('INSERT OR REPLACE INTO scores (league, key, payload, updated) VALUES (?, ?, ?, ?)', (league, key, payload, updated))
+        return updated
+
+    def AcquireLease(self, league: str, key: str) -> bool:
+        connection = self._connect()
+        now = time()
+        owner = self._owner()
+
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT owner, expires FROM leases WHERE league = ? AND key = ?', (league, key)).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                connection.execute('COMMIT')
+                return False
+            connection.execute('INSERT OR REPLACE INTO leases (league, key, owner, expires) VALUES (?, ?, ?, ?)', (league, key, owner, now + self.lease_seconds))
+            connection.execute('COMMIT')
+            return True
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def ReleaseLease(self, league: str, key: str) -> None:
+        self._connect().execute('DELETE FROM leases WHERE league = ? AND key = ? AND owner = ?', (league, key, self._owner()))
+
+    def WaitForUpdate(self, league: str, key: str, since: float, timeout: float) -> (tuple[list[Scorecard], float] | None):
+        end = time() + timeout
+        while True:
+            updated = self.GetUpdated(league, key)
+            if updated is not None and (since is None or updated > since):
+                return self.Get(league, key)
+            if time() >= end:
+                return None
+            sleep(self.poll_interval)
+
+    def InstallBudget(self) -> 'SharedBudgetTransport':
+        transport = fetch.GetTransport()
+        if isinstance(transport, SharedBudgetTransport) and transport.cache.filename == self.filename:
+            return transport
+        transport = SharedBudgetTransport(self, transport)
+        fetch.SetTransport(transport)
+        return transport
+
+    def AcquireRequest(self, site: str, timeout: float = 10) -> bool:
+        connection = self._connect()
+        end = time() + timeout
+
+        while True:
+            now = time()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM requests WHERE league = ? AND sent <= ?', (site, now - 60))
+                count, oldest = connection.execute('SELECT COUNT(*), MIN(sent) FROM requests WHERE league = ?', (site,)).fetchone()
+                if count < self.requests_per_minute:
+                    connection.execute('INSERT INTO requests (league, sent) VALUES (?, ?)', (site, now))
+                    connection.execute('COMMIT')
+                    return True
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+            wait_time = oldest + 60 - now
+            if now + wait_time > end:
+                return False
+            sleep(max(wait_time, self.poll_interval))
+
+class SharedBudgetTransport:
+    def __init__(self, cache: SharedScoreCache, transport, timeout: float = 10) -> None:
+        self.cache = cache
+        self.transport = transport
+        self.timeout = timeout
+
+    def __call__(self, url: str, timeout: float = None):
+        # Each attempt, including retries, hedges and fallbacks, takes a token from its site's budget
+        host = urlsplit(url).hostname
+        if not self.cache.AcquireRequest(host, self.timeout):
+            raise RequestBudgetExhausted(f'Host request budget for {host} is exhausted')
+        return self.transport(url, timeout=timeout)
@@ -0,0 +1,88 @@
+"""
+Tests for change_log, covering recovery from a segment left with a partial record by a crash.
+
+Run with: python -m unittest test_change_log
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+
+from change_log import ChangeLog, GameKey
+from scorecard import Scorecard
+
+_start = datetime(2024, 7, 4, 17, tzinfo=timezone.utc)
+
+def _makeCard() -> Scorecard:
+    card = Scorecard()
+    card.setNames('Yankees','Red Sox')
+    card.setAbbrs('NYY','BOS')
+    card.setDate(date(2024, 7, 4))
+    card.setScore(0,0)
+    card.setState('Top 1st')
+    return card
+
+class ChangeLogRecoveryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def testSeekAfterPartialRecord(self) -> None:
+        card = _makeCard()
+        t = _start.timestamp()
+
+        with ChangeLog(self.directory, index_interval=1) as log:
+            log.Record('mlb',[card],t)
+
+        with open(os.path.join(self.directory, f'{_start.date()}.log'), 'ab') as file:
+            file.write(b'\x00' * 5)
+
+        with ChangeLog(self.directory, index_interval=1) as log:
+            card.setScore(1,0)
+            card.setState('Top 2nd')
+            log.Record('mlb',[card],t + 10)
+            card.setScore(2,0)
+            card.setState('Top 3rd')
+            log.Record('mlb',[card],t + 20)
+
+        log = ChangeLog(self.directory)
+        try:
+            since = _start + timedelta(seconds=15)
+            changes = [(timestamp, card.game_state) for timestamp, card, _, _ in log.IterSegment(_start.date(), since=since)]
+            self.assertEqual(changes, [(_start + timedelta(seconds=20), 'Top 3rd')])
+
+            replay = [card.game_state for _, card in log.ReplayGame(GameKey('mlb',card),_start.date())]
+            self.assertEqual(replay, ['Top 1st', 'Top 2nd', 'Top 3rd'])
+        finally:
+            log.Close()
+
+    def testEveryIndexEntryPointsAtARecord(self) -> None:
+        card = _makeCard()
+        t = _start.timestamp()
+
+        with ChangeLog(self.directory, index_interval=1) as log:
+            log.Record('mlb',[card],t)
+        with open(os.path.join(self.directory, f'{_start.date()}.log'), 'ab') as file:
+            file.write(b'\x01\x02\x03')
+        with ChangeLog(self.directory, index_interval=1) as log:
+            for inning in range(2, 6):
+                card.setScore(inning,0)
+                card.setState(f'Top {inning}')
+                log.Record('mlb',[card],t + inning)
+
+        log = ChangeLog(self.directory)
+        try:
+            for offset in range(6):
+                moment = _start + timedelta(seconds=offset)
+                expected = [timestamp for timestamp, _, _, _ in log.IterSegment(_start.date()) if timestamp >= moment]
+                found = [timestamp for timestamp, _, _, _ in log.IterSegment(_start.date(), since=moment)]
+                self.assertEqual(found, expected)
+        finally:
+            log.Close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Contains functions that combine the scores of every league into a single timeline ordered by start time.
+Each league module returns its scores already sorted by start time, so the leagues are combined with a heap-based k-way merge that streams games in order without re-sorting them.
+Games without a known start time come last.
+"""
+
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+from scorecard import Scorecard, StartTimeKey
+
+_final_states = ('Final', 'Game Over', 'Completed')
+_not_played_states = ('Postponed', 'PPD', 'Canceled', 'Cancelled', 'Suspended', 'Forfeit')
+
+def _tagged(league: str, scores: list[Scorecard]) -> Iterator[tuple[str, Scorecard]]:
+    for score in scores:
+        if isinstance(score, Scorecard):
+            yield league, score
+
+def _itemKey(item: tuple[str, Scorecard]) -> datetime:
+    return StartTimeKey(item[1])
+
+def MergeTimeline(league_scores: dict[str, list[Scorecard]]) -> Iterator[tuple[str, Scorecard]]:
+    streams = [_tagged(league, scores) for league, scores in league_scores.items()]
+    return heapq.merge(*streams, key=_itemKey)
+
+def GetTimeline(scoreboard: dict) -> Iterator[tuple[str, Scorecard]]:
+    return MergeTimeline(scoreboard['scores'])
+
+def IsFinal(score: Scorecard) -> bool:
+    if score.game_state is None:
+        return False
+    return str.startswith(score.game_state, _final_states)
+
+def IsNotPlayed(score: Scorecard) -> bool:
+    if score.game_state is None:
+        return False
+    return str.startswith(score.game_state, _not_played_states)
+
+def IsInProgress(score: Scorecard) -> bool:
+    return score.score_team1 is not None and not IsFinal(score) and not IsNotPlayed(score)
+
+def GetNowAndNext(league_scores: dict[str, list[Scorecard]], now: datetime = None, window: timedelta = timedelta(hours=12),
+                  next_count: int = 10) -> tuple[list[tuple[str, Scorecard]], list[tuple[str, Scorecard]]]:
+    if now is None:
+        now = datetime.now(timezone.utc)
+    # The window only guards against stale scores; whether a game is on now comes from its state
+    earliest = now - window
+
+    on_now = []
+    on_next = []
+    for league, score in MergeTimeline(league_scores):
+        start_time = score.start_time
+        if IsInProgress(score):
+            if start_time is None or start_time >= earliest:
+                on_now.append((league, score))
+        elif start_time is not None and start_time > now and len(on_next) < next_count:
+            if score.score_team1 is None and not IsFinal(score) and not IsNotPlayed(score):
+                on_next.append((league, score))
+
+    return on_now, on_next